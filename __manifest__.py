@@ -11,11 +11,18 @@
     'author': 'Your Company',
     'depends': ['hr', 'hr_holidays'],
     'external_dependencies': {
-        'python': ['openpyxl', 'xlrd'],
+        'python': ['openpyxl', 'xlrd', 'numpy'],
     },
     'data': [
         'security/ir.model.access.csv',
+        'security/hr_leave_tracker_security.xml',
+        'data/hr_leave_tracker_cron.xml',
+        'data/hr_leave_tracker_actions.xml',
         'views/hr_leave_tracker_views.xml',
+        'views/hr_department_leave_rollup_views.xml',
+        'views/hr_employee_leave_balance_views.xml',
+        'views/hr_leave_balance_forecast_views.xml',
+        'views/hr_leave_tracker_delta_views.xml',
         'wizard/hr_leave_import_views.xml',
     ],
     'installable': True,
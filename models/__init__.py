@@ -1 +1,6 @@
-from . import hr_leave_tracker
\ No newline at end of file
+from . import hr_leave_tracker
+from . import hr_leave_tracker_delta
+from . import hr_department_leave_rollup
+from . import hr_employee_leave_balance
+from . import hr_leave_balance_forecast
+from . import hr_leave_tracker_benchmark
\ No newline at end of file
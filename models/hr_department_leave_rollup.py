@@ -0,0 +1,150 @@
+from odoo import models, fields, api
+from odoo.tools import sql
+import logging
+
+from .leave_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+# Key of the per-transaction set of (department_id, year) pairs to refresh
+ROLLUP_DIRTY_KEY = 'hr.department.leave.rollup.dirty'
+
+# Tracker fields that influence the rollup totals
+ROLLUP_FIELDS = {
+    'employee_id', 'leave_type_id', 'year', 'department_id',
+    'total_allocation', 'total_dynamic', 'display_total',
+    'taken_leaves', 'system_taken', 'pending_requests',
+}
+
+LOW_BALANCE_THRESHOLD = 3.0
+
+
+class HrDepartmentLeaveRollup(models.Model):
+    _name = 'hr.department.leave.rollup'
+    _description = 'Department Leave Balance Rollup'
+    _order = 'year desc, department_id, leave_type_id'
+    _log_access = False
+
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True, index=True)
+    year = fields.Char(string='Year', readonly=True, index=True)
+    leave_type_id = fields.Many2one('hr.leave.type', string='Leave Type', readonly=True)
+    employee_count = fields.Integer(string='Employees', readonly=True, group_operator='sum')
+    total = fields.Float(string='Total', readonly=True)
+    taken = fields.Float(string='Taken', readonly=True)
+    pending = fields.Float(string='Pending', readonly=True)
+    balance = fields.Float(string='Balance', readonly=True)
+    average_balance = fields.Float(string='Average Balance', readonly=True, group_operator=False)
+    low_count = fields.Integer(string='Low Balances', readonly=True,
+                               help='Employees with a balance above 0 and below 3 days.')
+    critical_count = fields.Integer(string='Critical Balances', readonly=True,
+                                    help='Employees with a balance of 0 days or less.')
+
+    def init(self):
+        """Index the tracker columns the incremental refresh filters on, and
+        key rollup rows by department, year and leave type for the upsert"""
+        if not sql.index_exists(self.env.cr, 'hr_leave_tracker_department_year_index'):
+            sql.create_index(
+                self.env.cr, 'hr_leave_tracker_department_year_index',
+                'hr_leave_tracker', ['department_id', 'year'],
+            )
+        if not sql.index_exists(self.env.cr, 'hr_department_leave_rollup_key_index'):
+            sql.create_unique_index(
+                self.env.cr, 'hr_department_leave_rollup_key_index',
+                self._table, ['COALESCE(department_id, 0)', 'year', 'leave_type_id'],
+            )
+
+    # --- REFRESH ---
+    @api.model
+    def _mark_dirty(self, keys):
+        """Queue (department_id, year) pairs for a refresh at commit time."""
+        if not keys:
+            return
+        data = self.env.cr.precommit.data
+        if ROLLUP_DIRTY_KEY not in data:
+            data[ROLLUP_DIRTY_KEY] = set()
+            self.env.cr.precommit.add(self._refresh_dirty)
+        data[ROLLUP_DIRTY_KEY].update(keys)
+
+    @api.model
+    def _refresh_dirty(self):
+        keys = self.env.cr.precommit.data.pop(ROLLUP_DIRTY_KEY, set())
+        if keys:
+            self._refresh(keys)
+
+    @api.model
+    @profiled('refresh', rows=lambda records, changed: changed)
+    def _refresh(self, keys=None):
+        """Recompute rollup rows for the given (department_id, year) pairs,
+        or every row when `keys` is None.
+
+        Rows are upserted and only rewritten when a value changed, so
+        transactions touching other departments or years never write the
+        same rollup rows.
+        """
+        self.env['hr.leave.tracker'].flush_model()
+        cr = self.env.cr
+        if keys is None:
+            condition, params = 'TRUE', []
+        else:
+            condition = """(COALESCE({alias}.department_id, 0), {alias}.year) IN (
+                SELECT * FROM unnest(%s::int[], %s::varchar[])
+            )"""
+            params = [[dept or 0 for dept, year in keys], [year for dept, year in keys]]
+
+        cr.execute(f"""
+            INSERT INTO hr_department_leave_rollup AS r (
+                department_id, year, leave_type_id, employee_count,
+                total, taken, pending, balance, average_balance,
+                low_count, critical_count
+            )
+            SELECT
+                t.department_id,
+                t.year,
+                t.leave_type_id,
+                COUNT(DISTINCT t.employee_id),
+                SUM(COALESCE(t.display_total, 0)),
+                SUM(COALESCE(t.taken_display, 0)),
+                SUM(COALESCE(t.pending_requests, 0)),
+                SUM(COALESCE(t.current_balance, 0)),
+                AVG(COALESCE(t.current_balance, 0)),
+                COUNT(*) FILTER (WHERE t.current_balance > 0 AND t.current_balance < {LOW_BALANCE_THRESHOLD}),
+                COUNT(*) FILTER (WHERE COALESCE(t.current_balance, 0) <= 0)
+            FROM hr_leave_tracker t
+            WHERE {condition.format(alias='t')}
+            GROUP BY t.department_id, t.year, t.leave_type_id
+            ON CONFLICT ((COALESCE(department_id, 0)), year, leave_type_id) DO UPDATE SET
+                employee_count = EXCLUDED.employee_count,
+                total = EXCLUDED.total,
+                taken = EXCLUDED.taken,
+                pending = EXCLUDED.pending,
+                balance = EXCLUDED.balance,
+                average_balance = EXCLUDED.average_balance,
+                low_count = EXCLUDED.low_count,
+                critical_count = EXCLUDED.critical_count
+            WHERE (r.employee_count, r.total, r.taken, r.pending, r.balance,
+                   r.average_balance, r.low_count, r.critical_count)
+                IS DISTINCT FROM
+                  (EXCLUDED.employee_count, EXCLUDED.total, EXCLUDED.taken, EXCLUDED.pending,
+                   EXCLUDED.balance, EXCLUDED.average_balance, EXCLUDED.low_count, EXCLUDED.critical_count)
+        """, params)
+        changed = cr.rowcount
+        # Drop rows whose department, year and leave type have no tracker left
+        cr.execute(f"""
+            DELETE FROM hr_department_leave_rollup r
+            WHERE {condition.format(alias='r')}
+              AND NOT EXISTS (
+                SELECT 1 FROM hr_leave_tracker t
+                WHERE COALESCE(t.department_id, 0) = COALESCE(r.department_id, 0)
+                  AND t.year = r.year
+                  AND t.leave_type_id = r.leave_type_id
+              )
+        """, params)
+        changed += cr.rowcount
+        self.invalidate_model()
+        _logger.info("Department leave rollup refreshed: %d rows changed", changed)
+        return changed
+
+    @api.model
+    def _cron_refresh_all(self):
+        """Full rebuild, e.g. after the cutoff date changes stored balances."""
+        return self._refresh()
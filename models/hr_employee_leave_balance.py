@@ -0,0 +1,85 @@
+from odoo import models, fields, api
+from odoo.tools import sql
+from datetime import date
+
+
+class HrEmployeeLeaveBalance(models.Model):
+    """Leave balances in long format: one row per employee, leave type and year.
+
+    Unlike hr.employee.leave.overview this has no per-category columns, so
+    new leave types show up without any code or view change.
+    """
+    _name = 'hr.employee.leave.balance'
+    _description = 'Employee Leave Balance by Leave Type'
+    _auto = False
+    _rec_name = 'leave_type_name'
+    _order = 'employee_id, leave_type_name'
+
+    tracker_id = fields.Many2one('hr.leave.tracker', string='Tracker', readonly=True)
+    employee_id = fields.Many2one('hr.employee', string='Employee', readonly=True)
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True)
+    leave_type_id = fields.Many2one('hr.leave.type', string='Leave Type', readonly=True)
+    leave_type_name = fields.Char(string='Leave Type Name', readonly=True)
+    year = fields.Char(string='Year', readonly=True)
+    total = fields.Float(string='Total', readonly=True)
+    taken = fields.Float(string='Taken', readonly=True)
+    pending = fields.Float(string='Pending', readonly=True)
+    balance = fields.Float(string='Balance', readonly=True)
+    annual_carry = fields.Float(string='Carry Forward', readonly=True)
+    expired_carry = fields.Float(string='Expired Carry', readonly=True)
+
+    def init(self):
+        """Create the long-format SQL view and its supporting index"""
+        if not sql.index_exists(self.env.cr, 'hr_leave_tracker_year_employee_index'):
+            sql.create_index(
+                self.env.cr, 'hr_leave_tracker_year_employee_index',
+                'hr_leave_tracker', ['year', 'employee_id'],
+            )
+        self.env.cr.execute("DROP VIEW IF EXISTS hr_employee_leave_balance CASCADE")
+        self.env.cr.execute("""
+            CREATE OR REPLACE VIEW hr_employee_leave_balance AS (
+                SELECT
+                    t.id AS id,
+                    t.id AS tracker_id,
+                    t.employee_id AS employee_id,
+                    t.department_id AS department_id,
+                    t.leave_type_id AS leave_type_id,
+                    t.leave_type_name AS leave_type_name,
+                    t.year AS year,
+                    COALESCE(t.display_total, 0) AS total,
+                    COALESCE(t.taken_display, 0) AS taken,
+                    COALESCE(t.pending_requests, 0) AS pending,
+                    COALESCE(t.current_balance, 0) AS balance,
+                    COALESCE(t.annual_carry, 0) AS annual_carry,
+                    COALESCE(t.expired_carry, 0) AS expired_carry
+                FROM hr_leave_tracker t
+            )
+        """)
+
+    @api.model
+    def get_balances(self, employee_ids=None, year=None):
+        """Return balances as a list of dicts with employee_id, leave_type_id,
+        category, total, taken, pending and balance, read in one query.
+
+        :param employee_ids: restrict to these employees (all when None)
+        :param year: year to read, defaults to the current year
+        """
+        self.check_access_rights('read')
+        year = str(year or date.today().year)
+        query = """
+            SELECT employee_id, leave_type_id, leave_type_name AS category,
+                   total, taken, pending, balance
+            FROM hr_employee_leave_balance
+            WHERE year = %s
+        """
+        params = [year]
+        if employee_ids is not None:
+            query += " AND employee_id = ANY(%s)"
+            params.append(list(employee_ids))
+        query += " ORDER BY employee_id, leave_type_name"
+        self.env['hr.leave.tracker'].flush_model()
+        self.env.cr.execute(query, params)
+        return self.env.cr.dictfetchall()
+
+    def action_open_tracker(self):
+        return self.tracker_id.action_edit_details()
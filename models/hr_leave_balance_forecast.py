@@ -0,0 +1,197 @@
+from odoo import models, fields, api, _
+from odoo.exceptions import UserError
+from datetime import date, timedelta
+import logging
+
+from .leave_profiler import profiled
+
+_logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# Months of history used for the average monthly consumption
+HISTORY_MONTHS = 12
+DAYS_PER_MONTH = 365.25 / 12
+
+
+class HrLeaveBalanceForecast(models.Model):
+    """Projected leave balances, cached per computation day.
+
+    Rows are rebuilt at most once a day for a given forecast date by
+    `_get_forecast_domain`; reading the list afterwards is a plain table scan.
+    """
+    _name = 'hr.leave.balance.forecast'
+    _description = 'Projected Leave Balance'
+    _order = 'projected_balance, employee_id'
+    _log_access = False
+
+    tracker_id = fields.Many2one('hr.leave.tracker', string='Tracker', readonly=True, ondelete='cascade')
+    employee_id = fields.Many2one('hr.employee', string='Employee', readonly=True)
+    department_id = fields.Many2one('hr.department', string='Department', readonly=True)
+    leave_type_id = fields.Many2one('hr.leave.type', string='Leave Type', readonly=True)
+    year = fields.Char(string='Year', readonly=True)
+    computed_on = fields.Date(string='Computed On', readonly=True, index=True)
+    forecast_date = fields.Date(string='Forecast Date', readonly=True, index=True)
+    current_balance = fields.Float(string='Current Balance', readonly=True)
+    accrual = fields.Float(string='Projected Accrual', readonly=True,
+                           help='Days accrued until the forecast date at the current accrual pace.')
+    approved_future = fields.Float(string='Approved Future Leaves', readonly=True)
+    pending = fields.Float(string='Pending Requests', readonly=True)
+    historical_usage = fields.Float(string='Usage at Historical Pace', readonly=True,
+                                    help='Average monthly consumption over the last 12 months, '
+                                         'extrapolated to the forecast date.')
+    projected_balance = fields.Float(string='Projected Balance', readonly=True)
+
+    # --- CACHE ---
+    @api.model
+    def _get_forecast_domain(self, forecast_date=None):
+        """Return the domain of the forecast rows for `forecast_date`
+        (default: year end), computing them if they were not computed today."""
+        today = fields.Date.context_today(self)
+        forecast_date = fields.Date.to_date(forecast_date) or date(today.year, 12, 31)
+        # dates as strings so the domain can be sent to the client in an action
+        domain = [
+            ('computed_on', '=', fields.Date.to_string(today)),
+            ('forecast_date', '=', fields.Date.to_string(forecast_date)),
+        ]
+        if not self.search_count(domain, limit=1):
+            self._compute_forecast(forecast_date, today)
+        return domain
+
+    @api.model
+    @profiled('compute_forecast', rows=lambda records, size: size)
+    def _compute_forecast(self, forecast_date, today):
+        """Project balances for every tracker of the forecast year in one
+        vectorized pass and store them as today's cache.
+
+        :return: the number of trackers projected
+        """
+        if not NUMPY_AVAILABLE:
+            raise UserError(_('numpy is required to compute leave forecasts.'))
+        self.env['hr.leave.tracker'].flush_model()
+        self.env['hr.leave'].flush_model()
+        self.env['hr.leave.allocation'].flush_model()
+        cr = self.env.cr
+        year = str(forecast_date.year)
+        year_start = date(forecast_date.year, 1, 1)
+        horizon_days = max((forecast_date - today).days, 0)
+
+        cr.execute("""
+            SELECT id, employee_id, leave_type_id, department_id, COALESCE(current_balance, 0),
+                   LOWER(leave_type_name) = 'annual leave'
+            FROM hr_leave_tracker
+            WHERE year = %s
+            ORDER BY id
+        """, [year])
+        trackers = cr.fetchall()
+        cr.execute(
+            "DELETE FROM hr_leave_balance_forecast WHERE computed_on < %s OR forecast_date = %s",
+            [today, forecast_date],
+        )
+        if not trackers:
+            return 0
+
+        tracker_ids, employee_ids, leave_type_ids, department_ids, balances, annual = zip(*trackers)
+        index = {(emp, lt): i for i, (emp, lt) in enumerate(zip(employee_ids, leave_type_ids))}
+        size = len(trackers)
+        current = np.array(balances, dtype=float)
+        is_annual = np.array([bool(flag) for flag in annual])
+
+        def accumulate(rows):
+            """Sum (employee_id, leave_type_id, value) rows into a tracker-aligned array."""
+            result = np.zeros(size)
+            if rows:
+                emp, lt, values = zip(*rows)
+                idx = np.fromiter((index.get(key, -1) for key in zip(emp, lt)), dtype=np.int64, count=len(rows))
+                mask = idx >= 0
+                np.add.at(result, idx[mask], np.asarray(values, dtype=float)[mask])
+            return result
+
+        # Accrual pace: days accrued so far divided by days elapsed since the accrual start
+        cr.execute("""
+            SELECT employee_id, holiday_status_id,
+                   SUM(number_of_days) / GREATEST(%(today)s - GREATEST(MIN(date_from), %(year_start)s), 1)
+            FROM hr_leave_allocation
+            WHERE state = 'validate'
+              AND allocation_type = 'accrual'
+              AND date_from <= %(today)s
+              AND (date_to IS NULL OR date_to >= %(today)s)
+            GROUP BY employee_id, holiday_status_id
+        """, {'today': today, 'year_start': year_start})
+        accrual = accumulate(cr.fetchall()) * horizon_days
+
+        # Approved leaves between tomorrow and the forecast date
+        cr.execute("""
+            SELECT employee_id, holiday_status_id, SUM(number_of_days)
+            FROM hr_leave
+            WHERE state = 'validate'
+              AND request_date_from > %s AND request_date_from <= %s
+            GROUP BY employee_id, holiday_status_id
+        """, [today, forecast_date])
+        approved_future = accumulate(cr.fetchall())
+
+        # The part of them the tracker balance already deducts. Only annual
+        # leave trackers take their taken days from hr.leave: taken_leaves
+        # (before the cutoff) and system_taken (after it) both include the
+        # future-dated validated leaves of the year.
+        cr.execute("""
+            SELECT employee_id, holiday_status_id, SUM(number_of_days)
+            FROM hr_leave
+            WHERE state = 'validate'
+              AND request_date_from > %s AND request_date_from <= %s
+              AND request_date_from >= %s AND request_date_to <= %s
+            GROUP BY employee_id, holiday_status_id
+        """, [today, forecast_date, year_start, date(forecast_date.year, 12, 31)])
+        already_deducted = np.where(is_annual, accumulate(cr.fetchall()), 0.0)
+
+        # Requests still waiting for approval up to the forecast date
+        cr.execute("""
+            SELECT employee_id, holiday_status_id, SUM(number_of_days)
+            FROM hr_leave
+            WHERE state IN ('confirm', 'validate1')
+              AND request_date_from <= %s
+              AND request_date_from >= %s
+            GROUP BY employee_id, holiday_status_id
+        """, [forecast_date, year_start])
+        pending = accumulate(cr.fetchall())
+
+        # Average monthly consumption over the last months, extrapolated
+        cr.execute("""
+            SELECT employee_id, holiday_status_id, SUM(number_of_days)
+            FROM hr_leave
+            WHERE state = 'validate'
+              AND request_date_from > %s AND request_date_from <= %s
+            GROUP BY employee_id, holiday_status_id
+        """, [today - timedelta(days=round(HISTORY_MONTHS * DAYS_PER_MONTH)), today])
+        historical_usage = accumulate(cr.fetchall()) / HISTORY_MONTHS * (horizon_days / DAYS_PER_MONTH)
+
+        # Planned leaves already cover part of the horizon; use whichever is larger
+        projected_usage = np.maximum(approved_future + pending, historical_usage)
+        projected = current + already_deducted + accrual - projected_usage
+
+        cr.execute("""
+            INSERT INTO hr_leave_balance_forecast (
+                tracker_id, employee_id, leave_type_id, department_id, year,
+                computed_on, forecast_date, current_balance, accrual,
+                approved_future, pending, historical_usage, projected_balance
+            )
+            SELECT tracker_id, employee_id, leave_type_id, department_id, %s, %s, %s,
+                   current_balance, accrual, approved_future, pending, historical_usage, projected_balance
+            FROM unnest(
+                %s::int[], %s::int[], %s::int[], %s::int[],
+                %s::float8[], %s::float8[], %s::float8[], %s::float8[], %s::float8[], %s::float8[]
+            ) AS f(tracker_id, employee_id, leave_type_id, department_id,
+                   current_balance, accrual, approved_future, pending, historical_usage, projected_balance)
+        """, [
+            year, today, forecast_date,
+            list(tracker_ids), list(employee_ids), list(leave_type_ids), list(department_ids),
+            current.round(2).tolist(), accrual.round(2).tolist(), approved_future.round(2).tolist(),
+            pending.round(2).tolist(), historical_usage.round(2).tolist(), projected.round(2).tolist(),
+        ])
+        self.invalidate_model()
+        _logger.info("Leave forecast computed for %s: %d trackers", forecast_date, size)
+        return size
@@ -1,9 +1,42 @@
 from odoo import models, fields, api
+from odoo.osv import expression
+from odoo.tools import split_every
 from datetime import date, timedelta
 import logging
+import time
+
+from .leave_profiler import profiled
+from .hr_department_leave_rollup import ROLLUP_FIELDS
+from .hr_leave_tracker_delta import TRACKED_FIELDS
 
 _logger = logging.getLogger(__name__)
 
+# Overview categories and the leave type name keywords matching them
+LEAVE_CATEGORIES = [
+    ('casual', ('casual',)),
+    ('annual', ('annual',)),
+    ('medical', ('medical', 'sick')),
+    ('unpaid', ('unpaid',)),
+    ('funeral', ('funeral', 'bereavement')),
+    ('marriage', ('marriage', 'wedding')),
+    ('maternity', ('maternity',)),
+    ('paternity', ('paternity',)),
+]
+
+
+def _category_keywords(category):
+    return dict(LEAVE_CATEGORIES).get(category, (category,))
+
+
+def _category_condition(alias, keywords):
+    """SQL condition matching a tracker's leave type name against keywords"""
+    return '(%s)' % ' OR '.join(f"{alias}.leave_type_name ILIKE '%{kw}%'" for kw in keywords)
+
+
+def _category_domain(field_name, category):
+    """Domain matching `field_name` against the keywords of a category"""
+    return expression.OR([[(field_name, 'ilike', kw)] for kw in _category_keywords(category)])
+
 
 class HrLeaveTracker(models.Model):
     _name = 'hr.leave.tracker'
@@ -11,6 +44,11 @@ class HrLeaveTracker(models.Model):
     _rec_name = 'name'
     _order = 'employee_id, year, leave_type_id'
 
+    _sql_constraints = [
+        ('employee_leave_type_year_unique', 'UNIQUE(employee_id, leave_type_id, year)',
+         'There is already a tracker for this employee, leave type and year.'),
+    ]
+
     # --- BASIC FIELDS ---
     employee_id = fields.Many2one('hr.employee', string='Employee', required=True, ondelete='cascade')
     leave_type_id = fields.Many2one('hr.leave.type', string='Leave Type', required=True, ondelete='cascade')
@@ -60,10 +98,12 @@ class HrLeaveTracker(models.Model):
         store=False
     )
 
+    # Stored so list views read it as a column; the daily stored-field
+    # refresh switches annual leave to system_taken after the cutoff.
     taken_display = fields.Float(
         string='Taken',
         compute='_compute_taken_display',
-        store=False
+        store=True
     )
 
     current_balance = fields.Float(
@@ -82,10 +122,124 @@ class HrLeaveTracker(models.Model):
                 vals["display_total"] = vals.get("total_dynamic", vals.get("total_allocation", 0.0))
             else:
                 vals["display_total"] = vals.get("total_allocation", 0.0)
-        return super(HrLeaveTracker, self).create(vals)
+        record = super(HrLeaveTracker, self).create(vals)
+        record._mark_rollup_dirty()
+        record._log_deltas(
+            [fname for fname in TRACKED_FIELDS if vals.get(fname)],
+            {record.id: [0.0] * len(TRACKED_FIELDS)},
+        )
+        return record
+
+    # --- DEPARTMENT ROLLUP REFRESH / BALANCE HISTORY ---
+    def write(self, vals):
+        if len(self) > 1:
+            self._lock_rows()
+        tracked = [fname for fname in TRACKED_FIELDS if fname in vals]
+        old_values = {record.id: [record[fname] for fname in tracked] for record in self} if tracked else {}
+        update_rollup = bool(ROLLUP_FIELDS.intersection(vals))
+        if update_rollup:
+            self._mark_rollup_dirty()
+        res = super(HrLeaveTracker, self).write(vals)
+        if update_rollup:
+            self._mark_rollup_dirty()
+        if tracked:
+            self._log_deltas(tracked, old_values)
+        return res
+
+    def _log_deltas(self, field_names, old_values):
+        """Log a delta row for every field whose value actually changed.
+
+        :param old_values: {tracker_id: [old value per field in field_names]}
+        """
+        if not field_names:
+            return
+        rows = []
+        for record in self:
+            for fname, old_value in zip(field_names, old_values[record.id]):
+                new_value = record[fname]
+                if new_value != old_value:
+                    rows.append((record.id, record.year, fname, old_value, new_value))
+        self.env['hr.leave.tracker.delta']._record(rows)
+
+    def unlink(self):
+        self._mark_rollup_dirty()
+        return super(HrLeaveTracker, self).unlink()
+
+    # --- LOCKING ---
+    def _lock_rows(self):
+        """Lock these trackers in id order so batch writes cannot deadlock."""
+        self.env.cr.execute(
+            "SELECT id FROM hr_leave_tracker WHERE id IN %s ORDER BY id FOR UPDATE",
+            [tuple(self.ids)],
+        )
+
+    @api.model
+    def _find_tracker_locked(self, employee_id, leave_type_id, year):
+        """Return the tracker for (employee, leave type, year), locked for update.
+
+        A transaction-level advisory lock on the key makes concurrent
+        search-then-create sequences wait for each other instead of
+        creating duplicates. It is released at commit or rollback.
+        """
+        self.env.cr.execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s))",
+            [f'hr.leave.tracker:{employee_id}:{leave_type_id}:{year}'],
+        )
+        self.flush_model(['employee_id', 'leave_type_id', 'year'])
+        self.env.cr.execute("""
+            SELECT id FROM hr_leave_tracker
+            WHERE employee_id = %s AND leave_type_id = %s AND year = %s
+            ORDER BY id
+            LIMIT 1
+            FOR UPDATE
+        """, [employee_id, leave_type_id, str(year)])
+        row = self.env.cr.fetchone()
+        return self.browse(row[0]) if row else self.browse()
+
+    # --- DUPLICATE MERGE ---
+    @api.model
+    def _merge_duplicate_trackers(self):
+        """Keep the most recently updated tracker of every (employee, leave
+        type, year) and delete the others, then add the unique constraint."""
+        self.flush_model()
+        self.env.cr.execute("""
+            SELECT ARRAY_AGG(id ORDER BY write_date DESC NULLS LAST, id DESC)
+            FROM hr_leave_tracker
+            GROUP BY employee_id, leave_type_id, year
+            HAVING COUNT(*) > 1
+        """)
+        groups = [row[0] for row in self.env.cr.fetchall()]
+        duplicate_ids = [tracker_id for ids in groups for tracker_id in ids[1:]]
+        if duplicate_ids:
+            self.browse(duplicate_ids).unlink()
+            self.flush_model()
+        self._add_sql_constraints()
+        result = {'groups': len(groups), 'removed': len(duplicate_ids)}
+        _logger.info("Duplicate leave trackers merged: %s", result)
+        return result
+
+    @api.model
+    def action_merge_duplicate_trackers(self):
+        result = self._merge_duplicate_trackers()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Duplicate Trackers Merged',
+                'message': '%(removed)s duplicates removed from %(groups)s employee/leave type/year groups' % result,
+                'type': 'success',
+            }
+        }
+
+    def _mark_rollup_dirty(self):
+        """Queue the (department, year) rollups of these trackers for refresh."""
+        self.env['hr.department.leave.rollup']._mark_dirty(
+            {(record.department_id.id, record.year) for record in self}
+        )
 
     # --- DISPLAY TOTAL (ANNUAL LEAVE vs OTHERS) ---
     @api.depends('total_allocation', 'total_dynamic', 'leave_type_id')
+    @profiled('compute_display_total')
     def _compute_display_total(self):
         for record in self:
             if record.leave_type_id and record.leave_type_id.name.lower() == 'annual leave':
@@ -102,6 +256,7 @@ class HrLeaveTracker(models.Model):
 
     # --- TAKEN DISPLAY (CUT-OFF LOGIC) ---
     @api.depends('taken_leaves', 'system_taken', 'leave_type_name')
+    @profiled('compute_taken_display')
     def _compute_taken_display(self):
         """Shows taken leave depending on cutoff: before or after June 30."""
         today = date.today()
@@ -112,8 +267,18 @@ class HrLeaveTracker(models.Model):
             else:
                 record.taken_display = record.taken_leaves
 
+    # --- CARRY DISPLAY ---
+    @api.depends('annual_carry', 'expired_carry')
+    def _compute_carry_display(self):
+        for record in self:
+            record.carry_display = (
+                f'{record.annual_carry:.2f} / '
+                f'<span class="text-danger">{record.expired_carry:.2f}</span>'
+            )
+
     # --- CURRENT BALANCE ---
     @api.depends('display_total', 'taken_leaves', 'system_taken', 'leave_type_name')
+    @profiled('compute_current_balance')
     def _compute_current_balance(self):
         today = date.today()
         cutoff_date = date(today.year, 6, 30)
@@ -131,6 +296,7 @@ class HrLeaveTracker(models.Model):
 
     # --- COMPUTE DISPLAY FIELDS ---
     @api.depends('employee_id', 'leave_type_id')
+    @profiled('compute_display_fields')
     def _compute_display_fields(self):
         for record in self:
             record.employee_name = record.employee_id.name or ''
@@ -140,6 +306,7 @@ class HrLeaveTracker(models.Model):
 
     # --- COMPUTE NAME ---
     @api.depends('employee_id', 'leave_type_id', 'year')
+    @profiled('compute_name')
     def _compute_name(self):
         for record in self:
             if record.employee_id and record.leave_type_id and record.year:
@@ -223,18 +390,166 @@ class HrLeaveTracker(models.Model):
             'target': 'new',
         }
 
+    # --- BULK RECOMPUTE OF STORED FIELDS ---
+    @api.model
+    @profiled('recompute_stored_fields', rows=lambda records, result: result['matched'])
+    def _recompute_stored_fields(self, domain=None, chunk_size=5000):
+        """Recompute the stored computed columns of the trackers matching
+        `domain` with set-based UPDATE ... FROM statements, `chunk_size`
+        rows at a time. Only rows whose values actually change are written.
+
+        Covers employee_name, employee_number, department_id,
+        leave_type_name, name, display_total, taken_display and
+        current_balance, which are not refreshed when an employee or leave
+        type is edited, nor when the June 30 cutoff passes.
+
+        :return: dict with the number of matched and changed rows and the
+                 elapsed time in seconds
+        """
+        start = time.perf_counter()
+        self.flush_model()
+        ids = self.search(domain or []).ids
+        today = date.today()
+        if 'employee_number' in self.env['hr.employee']._fields:
+            employee_number = "e.employee_number"
+        else:
+            employee_number = "CAST(e.id AS VARCHAR)"
+        lang = self.env.lang or 'en_US'
+
+        changed = 0
+        rollup_keys = set()
+        for chunk in split_every(chunk_size, ids):
+            self.env.cr.execute(f"""
+                WITH src AS (
+                    SELECT t.id,
+                           e.name AS employee_name,
+                           {employee_number} AS employee_number,
+                           e.department_id,
+                           COALESCE(lt.name->>%(lang)s, lt.name->>'en_US') AS leave_type_name,
+                           t.year,
+                           CASE WHEN LOWER(COALESCE(lt.name->>%(lang)s, lt.name->>'en_US')) = 'annual leave'
+                                THEN t.total_dynamic ELSE t.total_allocation
+                           END AS display_total,
+                           t.taken_leaves,
+                           t.system_taken
+                    FROM hr_leave_tracker t
+                    JOIN hr_employee e ON e.id = t.employee_id
+                    JOIN hr_leave_type lt ON lt.id = t.leave_type_id
+                    WHERE t.id IN %(ids)s
+                    -- rows being edited are left for the next run
+                    FOR UPDATE OF t SKIP LOCKED
+                ), new AS (
+                    SELECT id, employee_name, employee_number, department_id, leave_type_name,
+                           employee_name || ' - ' || leave_type_name || ' (' || year || ')' AS name,
+                           display_total,
+                           taken_display,
+                           display_total - taken_display AS current_balance
+                    FROM (
+                        SELECT src.*,
+                               CASE WHEN LOWER(leave_type_name) = 'annual leave' AND %(after_cutoff)s
+                                    THEN COALESCE(system_taken, 0)
+                                    ELSE COALESCE(taken_leaves, 0)
+                               END AS taken_display
+                        FROM src
+                    ) cutoff
+                )
+                UPDATE hr_leave_tracker t
+                SET employee_name = new.employee_name,
+                    employee_number = new.employee_number,
+                    department_id = new.department_id,
+                    leave_type_name = new.leave_type_name,
+                    name = new.name,
+                    display_total = new.display_total,
+                    taken_display = new.taken_display,
+                    current_balance = new.current_balance
+                FROM new, hr_leave_tracker old
+                WHERE t.id = new.id AND old.id = t.id
+                  AND (t.employee_name IS DISTINCT FROM new.employee_name
+                       OR t.employee_number IS DISTINCT FROM new.employee_number
+                       OR t.department_id IS DISTINCT FROM new.department_id
+                       OR t.leave_type_name IS DISTINCT FROM new.leave_type_name
+                       OR t.name IS DISTINCT FROM new.name
+                       OR t.display_total IS DISTINCT FROM new.display_total
+                       OR t.taken_display IS DISTINCT FROM new.taken_display
+                       OR t.current_balance IS DISTINCT FROM new.current_balance)
+                RETURNING old.department_id, t.department_id, t.year
+            """, {
+                'ids': tuple(chunk),
+                'lang': lang,
+                'after_cutoff': today > date(today.year, 6, 30),
+            })
+            for old_department_id, department_id, year in self.env.cr.fetchall():
+                rollup_keys.add((old_department_id, year))
+                rollup_keys.add((department_id, year))
+                changed += 1
+
+        self.invalidate_model([
+            'employee_name', 'employee_number', 'department_id', 'leave_type_name',
+            'name', 'display_total', 'taken_display', 'current_balance',
+        ])
+        self.env['hr.department.leave.rollup']._mark_dirty(rollup_keys)
+        result = {
+            'matched': len(ids),
+            'changed': changed,
+            'elapsed': round(time.perf_counter() - start, 3),
+        }
+        _logger.info("Leave tracker stored fields recomputed: %s", result)
+        return result
+
+    @api.model
+    def _cron_recompute_stored_fields(self):
+        """Daily refresh of the current year's trackers; this is also the
+        job that applies the June 30 cutoff to the stored balances."""
+        return self._recompute_stored_fields([('year', '=', str(date.today().year))])
+
+    def action_recompute_stored_fields(self):
+        """Server action: recompute the selected trackers."""
+        result = self._recompute_stored_fields([('id', 'in', self.ids)])
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': 'Stored Fields Recomputed',
+                'message': '%(changed)s of %(matched)s trackers changed in %(elapsed)ss' % result,
+                'type': 'success',
+            }
+        }
+
+
+    # --- FORECAST ---
+    @api.model
+    def get_projected_balances(self, forecast_date=None, order='projected_balance'):
+        """Projected balances of all trackers at `forecast_date` (default:
+        year end), as a list of dicts sorted by `order`. Cached per day."""
+        Forecast = self.env['hr.leave.balance.forecast']
+        return Forecast.search_read(Forecast._get_forecast_domain(forecast_date), [
+            'employee_id', 'leave_type_id', 'department_id', 'forecast_date',
+            'current_balance', 'accrual', 'approved_future', 'pending',
+            'historical_usage', 'projected_balance',
+        ], order=order)
+
+    @api.model
+    def action_open_forecast(self, forecast_date=None):
+        domain = self.env['hr.leave.balance.forecast']._get_forecast_domain(forecast_date)
+        action = self.env['ir.actions.act_window']._for_xml_id('hr_leave_tracker.action_hr_leave_balance_forecast')
+        action['domain'] = domain
+        return action
+
 
 class HrEmployeeLeaveOverview(models.Model):
     _name = 'hr.employee.leave.overview'
     _description = 'Employee Leave Balance Overview'
     _auto = False
     _rec_name = 'employee_name'
+    _order = 'employee_name'
 
     employee_id = fields.Many2one('hr.employee', string='Employee')
     employee_number = fields.Char(string='Employee ID')
     employee_name = fields.Char(string='Employee Name')
     department_id = fields.Many2one('hr.department', string='Department')
     department_name = fields.Char(string='Department Name')
+    year = fields.Char(string='Year')
+    company_id = fields.Many2one('res.company', string='Company')
 
     # Casual leave
     casual_total = fields.Float(string='Casual Total')
@@ -286,314 +601,126 @@ class HrEmployeeLeaveOverview(models.Model):
     paternity_pending = fields.Float(string='Paternity Pending')
     paternity_balance = fields.Float(string='Paternity Balance')
 
+    # All leave types in long format, whatever their category
+    balance_ids = fields.One2many(
+        'hr.employee.leave.balance',
+        compute='_compute_balance_ids',
+        string='Leave Balances',
+    )
+
+    @profiled('create_view', rows=None)
     def init(self):
-        """Create SQL view including total, taken, pending, balance, carry"""
-        today = date.today()
-        cutoff_date = date(today.year, 6, 30)
-        current_year = str(today.year)
-        
+        """Create SQL view including total, taken, pending, balance, carry.
+
+        Every category is aggregated from a single join on hr_leave_tracker
+        with FILTER clauses, so adding a category adds no join. There is one
+        row per employee and year (any year with trackers, plus the current
+        one); filters on year and company are pushed down to the tracker and
+        employee scans, and the multi-company record rule applies to
+        company_id.
+        """
+        columns = []
+        for category, keywords in LEAVE_CATEGORIES:
+            condition = _category_condition('t', keywords)
+            if category == 'annual':
+                total = 't.total_dynamic'
+                taken = 't.taken_display'
+            else:
+                total = 't.total_allocation'
+                taken = 't.taken_leaves'
+            for suffix, sql_expr in (
+                ('total', total),
+                ('taken', taken),
+                ('pending', 't.pending_requests'),
+                ('balance', 't.current_balance'),
+            ):
+                columns.append(
+                    f"COALESCE(SUM({sql_expr}) FILTER (WHERE {condition}), 0) AS {category}_{suffix}"
+                )
+            if category == 'annual':
+                columns.append(f"COALESCE(SUM(t.annual_carry) FILTER (WHERE {condition}), 0) AS annual_carry")
+                columns.append(f"COALESCE(SUM(t.expired_carry) FILTER (WHERE {condition}), 0) AS expired_carry")
+
         self.env.cr.execute("DROP VIEW IF EXISTS hr_employee_leave_overview CASCADE")
-        
+
         self.env.cr.execute(f"""
             CREATE OR REPLACE VIEW hr_employee_leave_overview AS (
-                SELECT 
-                    ROW_NUMBER() OVER (ORDER BY e.id) AS id,
+                SELECT
+                    CAST(e.id AS BIGINT) * 10000 + CAST(y.year AS INTEGER) AS id,
                     e.id AS employee_id,
                     COALESCE(e.employee_number, CAST(e.id AS VARCHAR)) AS employee_number,
                     e.name AS employee_name,
                     e.department_id AS department_id,
                     d.name AS department_name,
-
-                    -- Casual leave
-                    COALESCE(casual.total_allocation,0) AS casual_total,
-                    COALESCE(casual.taken_leaves,0) AS casual_taken,
-                    COALESCE(casual.pending_requests,0) AS casual_pending,
-                    COALESCE(casual.current_balance,0) AS casual_balance,
-
-                    -- Annual leave
-                    COALESCE(annual.total_dynamic,0) AS annual_total,
-                    CASE
-                        WHEN CURRENT_DATE > DATE '{today.year}-06-30' THEN COALESCE(annual.system_taken,0)
-                        ELSE COALESCE(annual.taken_leaves,0)
-                    END AS annual_taken,
-                    COALESCE(annual.pending_requests,0) AS annual_pending,
-                    CASE
-                        WHEN CURRENT_DATE > DATE '{today.year}-06-30' THEN COALESCE(annual.total_dynamic,0) - COALESCE(annual.system_taken,0)
-                        ELSE COALESCE(annual.current_balance,0)
-                    END AS annual_balance,
-                    COALESCE(annual.annual_carry,0) AS annual_carry,
-                    COALESCE(annual.expired_carry,0) AS expired_carry,
-
-                    -- Medical leave
-                    COALESCE(medical.total_allocation,0) AS medical_total,
-                    COALESCE(medical.taken_leaves,0) AS medical_taken,
-                    COALESCE(medical.pending_requests,0) AS medical_pending,
-                    COALESCE(medical.current_balance,0) AS medical_balance,
-
-                    -- Unpaid leave
-                    COALESCE(unpaid.total_allocation,0) AS unpaid_total,
-                    COALESCE(unpaid.taken_leaves,0) AS unpaid_taken,
-                    COALESCE(unpaid.pending_requests,0) AS unpaid_pending,
-                    COALESCE(unpaid.current_balance,0) AS unpaid_balance,
-
-                    -- Funeral leave
-                    COALESCE(funeral.total_allocation,0) AS funeral_total,
-                    COALESCE(funeral.taken_leaves,0) AS funeral_taken,
-                    COALESCE(funeral.pending_requests,0) AS funeral_pending,
-                    COALESCE(funeral.current_balance,0) AS funeral_balance,
-
-                    -- Marriage leave
-                    COALESCE(marriage.total_allocation,0) AS marriage_total,
-                    COALESCE(marriage.taken_leaves,0) AS marriage_taken,
-                    COALESCE(marriage.pending_requests,0) AS marriage_pending,
-                    COALESCE(marriage.current_balance,0) AS marriage_balance,
-
-                    -- Maternity leave
-                    COALESCE(maternity.total_allocation,0) AS maternity_total,
-                    COALESCE(maternity.taken_leaves,0) AS maternity_taken,
-                    COALESCE(maternity.pending_requests,0) AS maternity_pending,
-                    COALESCE(maternity.current_balance,0) AS maternity_balance,
-
-                    -- Paternity leave
-                    COALESCE(paternity.total_allocation,0) AS paternity_total,
-                    COALESCE(paternity.taken_leaves,0) AS paternity_taken,
-                    COALESCE(paternity.pending_requests,0) AS paternity_pending,
-                    COALESCE(paternity.current_balance,0) AS paternity_balance
-
+                    y.year AS year,
+                    e.company_id AS company_id,
+                    {', '.join(columns)}
                 FROM hr_employee e
+                CROSS JOIN (
+                    SELECT DISTINCT year FROM hr_leave_tracker WHERE year ~ '^[0-9]{{4}}$'
+                    UNION
+                    SELECT CAST(EXTRACT(YEAR FROM CURRENT_DATE) AS VARCHAR)
+                ) y
                 LEFT JOIN hr_department d ON e.department_id = d.id
-                LEFT JOIN hr_leave_tracker casual ON e.id = casual.employee_id 
-                    AND casual.leave_type_name ILIKE '%casual%' 
-                    AND casual.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker annual ON e.id = annual.employee_id 
-                    AND annual.leave_type_name ILIKE '%annual%' 
-                    AND annual.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker medical ON e.id = medical.employee_id 
-                    AND (medical.leave_type_name ILIKE '%medical%' OR medical.leave_type_name ILIKE '%sick%')
-                    AND medical.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker unpaid ON e.id = unpaid.employee_id 
-                    AND unpaid.leave_type_name ILIKE '%unpaid%' 
-                    AND unpaid.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker funeral ON e.id = funeral.employee_id 
-                    AND (funeral.leave_type_name ILIKE '%funeral%' OR funeral.leave_type_name ILIKE '%bereavement%')
-                    AND funeral.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker marriage ON e.id = marriage.employee_id 
-                    AND (marriage.leave_type_name ILIKE '%marriage%' OR marriage.leave_type_name ILIKE '%wedding%')
-                    AND marriage.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker maternity ON e.id = maternity.employee_id 
-                    AND maternity.leave_type_name ILIKE '%maternity%' 
-                    AND maternity.year = '{current_year}'
-                LEFT JOIN hr_leave_tracker paternity ON e.id = paternity.employee_id 
-                    AND paternity.leave_type_name ILIKE '%paternity%' 
-                    AND paternity.year = '{current_year}'
+                LEFT JOIN hr_leave_tracker t ON e.id = t.employee_id
+                    AND t.year = y.year
                 WHERE e.active = TRUE
-                ORDER BY e.name
+                GROUP BY e.id, y.year, d.name
             )
         """)
 
-    def action_view_casual_details(self):
-        return self._open_leave_details('casual')
-    
-    def action_view_annual_details(self):
-        return self._open_leave_details('annual')
-    
-    def action_view_medical_details(self):
-        return self._open_leave_details('medical')
-    
-    def action_view_unpaid_details(self):
-        return self._open_leave_details('unpaid')
-    
-    def action_view_funeral_details(self):
-        return self._open_leave_details('funeral')
-    
-    def action_view_marriage_details(self):
-        return self._open_leave_details('marriage')
+    @api.depends('employee_id', 'year')
+    def _compute_balance_ids(self):
+        balances = self.env['hr.employee.leave.balance'].search([
+            ('employee_id', 'in', self.employee_id.ids),
+            ('year', 'in', list(set(self.mapped('year')))),
+        ])
+        for rec in self:
+            rec.balance_ids = balances.filtered(
+                lambda b: b.employee_id == rec.employee_id and b.year == rec.year)
 
+    @profiled('redirect_write')
     def write(self, vals):
-        """Redirect writes from the SQL view to hr.leave.tracker records"""
-        year = str(date.today().year)
-
-        # mapping of overview field → (leave type search keyword, tracker field)
-        field_map = {
-            'casual_total': ('casual', 'total_allocation'),
-            'casual_taken': ('casual', 'taken_leaves'),
-            'casual_pending': ('casual', 'pending_requests'),
-
-            'annual_total': ('annual', 'total_allocation'),
-            'annual_taken': ('annual', 'taken_leaves'),
-            'annual_pending': ('annual', 'pending_requests'),
-
-            'medical_total': ('medical', 'total_allocation'),
-            'medical_taken': ('medical', 'taken_leaves'),
-            'medical_pending': ('medical', 'pending_requests'),
-
-            'unpaid_total': ('unpaid', 'total_allocation'),
-            'unpaid_taken': ('unpaid', 'taken_leaves'),
-            'unpaid_pending': ('unpaid', 'pending_requests'),
-
-            'funeral_total': ('funeral', 'total_allocation'),
-            'funeral_taken': ('funeral', 'taken_leaves'),
-            'funeral_pending': ('funeral', 'pending_requests'),
-
-            'marriage_total': ('marriage', 'total_allocation'),
-            'marriage_taken': ('marriage', 'taken_leaves'),
-            'marriage_pending': ('marriage', 'pending_requests'),
-
-            'maternity_total': ('maternity', 'total_allocation'),
-            'maternity_taken': ('maternity', 'taken_leaves'),
-            'maternity_pending': ('maternity', 'pending_requests'),
-
-            'paternity_total': ('paternity', 'total_allocation'),
-            'paternity_taken': ('paternity', 'taken_leaves'),
-            'paternity_pending': ('paternity', 'pending_requests'),
-        }
+        """Redirect writes from the SQL view to hr.leave.tracker records
+        of the row's year"""
+        # overview field → (leave category, tracker field)
+        field_map = {}
+        for category, keywords in LEAVE_CATEGORIES:
+            field_map[f'{category}_total'] = (category, 'total_allocation')
+            field_map[f'{category}_taken'] = (category, 'taken_leaves')
+            field_map[f'{category}_pending'] = (category, 'pending_requests')
+
+        # group updates per leave category
+        updates_by_type = {}
+        for field, value in vals.items():
+            if field in field_map:
+                category, tracker_field = field_map[field]
+                updates_by_type.setdefault(category, {})[tracker_field] = value
 
         for rec in self:
-            updates_by_type = {}
-
-            # group updates per leave type
-            for field, value in vals.items():
-                if field in field_map:
-                    leave_type_key, tracker_field = field_map[field]
-                    updates_by_type.setdefault(leave_type_key, {})[tracker_field] = value
-
-            # now apply grouped updates
-            for leave_type_key, updates in updates_by_type.items():
-                tracker = self.env['hr.leave.tracker'].search([
-                    ('employee_id', '=', rec.employee_id.id),
-                    ('leave_type_name', 'ilike', f'%{leave_type_key}%'),
-                    ('year', '=', year)
-                ], limit=1)
+            year = rec.year
+            for category, updates in updates_by_type.items():
+                tracker = self.env['hr.leave.tracker'].search(
+                    [('employee_id', '=', rec.employee_id.id), ('year', '=', year)]
+                    + _category_domain('leave_type_name', category),
+                    limit=1,
+                )
 
-                if tracker:
-                    _logger.info("Updating %s tracker for %s: %s", leave_type_key, rec.employee_name, updates)
-                    tracker.write(updates)
-                else:
-                    leave_type = self.env['hr.leave.type'].search([
-                        ('name', 'ilike', f'%{leave_type_key}%')
-                    ], limit=1)
+                if not tracker:
+                    leave_type = self.env['hr.leave.type'].search(_category_domain('name', category), limit=1)
 
                     if not leave_type:
-                        _logger.warning("No leave type found for keyword '%s' when writing to %s", leave_type_key, rec.employee_name)
+                        _logger.warning("No leave type found for category '%s' when writing to %s", category, rec.employee_name)
                         continue  # skip this type if leave_type is missing
 
-                    values = {
-                        'employee_id': rec.employee_id.id,
-                        'leave_type_id': leave_type.id,
-                        'year': year,
-                    }
-                    values.update(updates)
-
-                    _logger.info("Creating %s tracker for %s: %s", leave_type_key, rec.employee_name, values)
-                    self.env['hr.leave.tracker'].create(values)
-
-        return True
-
-    def action_view_maternity_details(self):
-        return self._open_leave_details('maternity')
-    
-    def action_view_paternity_details(self):
-        return self._open_leave_details('paternity')
-
-    def _open_leave_details(self, leave_type):
-        """Open detailed view for specific leave type"""
-        # Find the tracker record for this employee and leave type
-        current_year = str(date.today().year)
-        
-        tracker = self.env['hr.leave.tracker'].search([
-            ('employee_id', '=', self.employee_id.id),
-            ('leave_type_name', 'ilike', f'%{leave_type}%'),
-            ('year', '=', current_year)
-        ], limit=1)
-        
-        if tracker:
-            return {
-                'type': 'ir.actions.act_window',
-                'name': f'{leave_type.title()} Leave Details - {self.employee_name}',
-                'res_model': 'hr.leave.tracker',
-                'res_id': tracker.id,
-                'view_mode': 'form',
-                'target': 'new',
-            }
-        else:
-            return {
-                'type': 'ir.actions.client',
-                'tag': 'display_notification',
-                'params': {
-                    'title': 'No Data',
-                    'message': f'No {leave_type} leave data found for {self.employee_name}',
-                    'type': 'warning',
-                }
-            }
-    
-    def write(self, vals):
-        """Redirect writes from the SQL view to hr.leave.tracker records"""
-        year = str(date.today().year)
-
-        # mapping of overview field → (leave type search keyword, tracker field)
-        field_map = {
-            'casual_total': ('casual', 'total_allocation'),
-            'casual_taken': ('casual', 'taken_leaves'),
-            'casual_pending': ('casual', 'pending_requests'),
-
-            'annual_total': ('annual', 'total_allocation'),
-            'annual_taken': ('annual', 'taken_leaves'),
-            'annual_pending': ('annual', 'pending_requests'),
-
-            'medical_total': ('medical', 'total_allocation'),
-            'medical_taken': ('medical', 'taken_leaves'),
-            'medical_pending': ('medical', 'pending_requests'),
-
-            'unpaid_total': ('unpaid', 'total_allocation'),
-            'unpaid_taken': ('unpaid', 'taken_leaves'),
-            'unpaid_pending': ('unpaid', 'pending_requests'),
-
-            'funeral_total': ('funeral', 'total_allocation'),
-            'funeral_taken': ('funeral', 'taken_leaves'),
-            'funeral_pending': ('funeral', 'pending_requests'),
-
-            'marriage_total': ('marriage', 'total_allocation'),
-            'marriage_taken': ('marriage', 'taken_leaves'),
-            'marriage_pending': ('marriage', 'pending_requests'),
-
-            'maternity_total': ('maternity', 'total_allocation'),
-            'maternity_taken': ('maternity', 'taken_leaves'),
-            'maternity_pending': ('maternity', 'pending_requests'),
-
-            'paternity_total': ('paternity', 'total_allocation'),
-            'paternity_taken': ('paternity', 'taken_leaves'),
-            'paternity_pending': ('paternity', 'pending_requests'),
-        }
-
-        for rec in self:
-            updates_by_type = {}
-
-            # group updates per leave type
-            for field, value in vals.items():
-                if field in field_map:
-                    leave_type_key, tracker_field = field_map[field]
-                    updates_by_type.setdefault(leave_type_key, {})[tracker_field] = value
-
-            # now apply grouped updates
-            for leave_type_key, updates in updates_by_type.items():
-                tracker = self.env['hr.leave.tracker'].search([
-                    ('employee_id', '=', rec.employee_id.id),
-                    ('leave_type_name', 'ilike', f'%{leave_type_key}%'),
-                    ('year', '=', year)
-                ], limit=1)
+                    # another transaction may have created it meanwhile
+                    tracker = self.env['hr.leave.tracker']._find_tracker_locked(
+                        rec.employee_id.id, leave_type.id, year)
 
                 if tracker:
-                    _logger.info("Updating %s tracker for %s: %s", leave_type_key, rec.employee_name, updates)
-                    tracker.write(updates)
+                    _logger.info("Updating %s tracker for %s: %s", category, rec.employee_name, updates)
+                    tracker.with_context(leave_delta_source='overview').write(updates)
                 else:
-                    leave_type = self.env['hr.leave.type'].search([
-                        ('name', 'ilike', f'%{leave_type_key}%')
-                    ], limit=1)
-
-                    if not leave_type:
-                        _logger.warning("No leave type found for keyword '%s' when writing to %s", leave_type_key, rec.employee_name)
-                        continue  # skip this type if leave_type is missing
-
                     values = {
                         'employee_id': rec.employee_id.id,
                         'leave_type_id': leave_type.id,
@@ -601,7 +728,7 @@ class HrEmployeeLeaveOverview(models.Model):
                     }
                     values.update(updates)
 
-                    _logger.info("Creating %s tracker for %s: %s", leave_type_key, rec.employee_name, values)
-                    self.env['hr.leave.tracker'].create(values)
+                    _logger.info("Creating %s tracker for %s: %s", category, rec.employee_name, values)
+                    self.env['hr.leave.tracker'].with_context(leave_delta_source='overview').create(values)
 
         return True
@@ -0,0 +1,355 @@
+from odoo import models, api, _
+from odoo.exceptions import AccessError
+from datetime import date, timedelta
+import base64
+import csv
+import io
+import json
+import logging
+import random
+import time
+
+_logger = logging.getLogger(__name__)
+
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    OPENPYXL_AVAILABLE = False
+
+# Leave type names created by the generator; the first eight match the
+# keyword categories used by hr.employee.leave.overview.
+BENCH_LEAVE_TYPES = [
+    'Annual Leave', 'Casual Leave', 'Medical Leave', 'Unpaid Leave',
+    'Funeral Leave', 'Marriage Leave', 'Maternity Leave', 'Paternity Leave',
+]
+
+# Column order expected by the import wizard for positional (Excel) rows
+IMPORT_HEADERS = [
+    'Name', 'Employee ID', 'Department', 'Leave Type', 'Year',
+    'Total Allocation', 'Taken Leaves', 'Pending Requests', 'Current Balance',
+    'Carry Forwarded', 'Expired Carry', 'Imported Taken',
+]
+
+
+class HrLeaveTrackerBenchmark(models.AbstractModel):
+    """Synthetic data generator and benchmark suite for the leave tracker.
+
+    Meant to be run from ``odoo-bin shell`` against a disposable database::
+
+        bench = env['hr.leave.tracker.benchmark']
+        bench._populate(employees=5000, departments=300, years=2)
+        env.cr.commit()
+        report = bench._run(import_sizes=(1000, 10000, 100000))
+        with open('/tmp/bench.json', 'w') as f:
+            f.write(report)
+
+    Every benchmark case runs inside a savepoint that is rolled back
+    afterwards, so consecutive runs measure the same dataset. Both entry
+    points are private and restricted to the superuser.
+    """
+    _name = 'hr.leave.tracker.benchmark'
+    _description = 'HR Leave Tracker Benchmark'
+
+    def _check_superuser(self):
+        if not self.env.is_superuser():
+            raise AccessError(_('The leave tracker benchmark can only be run by the superuser.'))
+
+    # --- DATA GENERATION ---
+    @api.model
+    def _populate(self, employees=1000, departments=50, leave_types=8, years=2,
+                 leaves_per_employee=4, allocations_per_employee=None, seed=42):
+        """Create departments, employees, leave types, allocations, leaves
+        and tracker rows. Returns the number of records created per model."""
+        self._check_superuser()
+        rnd = random.Random(seed)
+        ctx = dict(
+            self.env.context,
+            tracking_disable=True,
+            mail_create_nolog=True,
+            mail_notrack=True,
+            leave_fast_create=True,
+            leave_skip_state_check=True,
+        )
+        env = self.with_context(ctx).env
+        today = date.today()
+        year_list = [today.year - offset for offset in range(years)]
+        if allocations_per_employee is None:
+            allocations_per_employee = leave_types
+
+        # Departments
+        department_ids = env['hr.department'].create([
+            {'name': f'Bench Department {i:04d}'} for i in range(departments)
+        ]).ids
+
+        # Leave types: reuse existing ones by name so the import can match them
+        type_names = (BENCH_LEAVE_TYPES + [
+            f'Bench Leave {i:02d}' for i in range(max(leave_types - len(BENCH_LEAVE_TYPES), 0))
+        ])[:leave_types]
+        LeaveType = env['hr.leave.type']
+        leave_type_ids = []
+        created_types = 0
+        for type_name in type_names:
+            leave_type = LeaveType.search([('name', '=', type_name)], limit=1)
+            if not leave_type:
+                leave_type = LeaveType.create({'name': type_name, 'requires_allocation': 'yes'})
+                created_types += 1
+            leave_type_ids.append(leave_type.id)
+
+        # Employees
+        Employee = env['hr.employee']
+        has_number = 'employee_number' in Employee._fields
+        employee_vals = []
+        for i in range(employees):
+            vals = {
+                'name': f'Bench Employee {i:06d}',
+                'department_id': rnd.choice(department_ids) if department_ids else False,
+            }
+            if has_number:
+                vals['employee_number'] = f'BENCH{i:06d}'
+            employee_vals.append(vals)
+        employee_ids = Employee.create(employee_vals).ids
+
+        # Allocations
+        allocation_vals = []
+        for employee_id in employee_ids:
+            for leave_type_id in rnd.sample(leave_type_ids, min(allocations_per_employee, len(leave_type_ids))):
+                for year in year_list:
+                    allocation_vals.append({
+                        'name': f'Bench Allocation {year}',
+                        'employee_id': employee_id,
+                        'holiday_status_id': leave_type_id,
+                        'number_of_days': rnd.choice([5, 10, 14, 20]),
+                        'date_from': date(year, 1, 1),
+                        'date_to': date(year, 12, 31),
+                        'state': 'validate',
+                    })
+        allocations = env['hr.leave.allocation'].create(allocation_vals)
+
+        # Leaves: one-day requests spread over each year, no overlaps per employee
+        leave_vals = []
+        for employee_id in employee_ids:
+            for year in year_list:
+                days = rnd.sample(range(0, 360), min(leaves_per_employee, 360))
+                for day in days:
+                    day_from = date(year, 1, 1) + timedelta(days=day)
+                    leave_vals.append({
+                        'employee_id': employee_id,
+                        'holiday_status_id': rnd.choice(leave_type_ids),
+                        'request_date_from': day_from,
+                        'request_date_to': day_from,
+                        'date_from': f'{day_from} 08:00:00',
+                        'date_to': f'{day_from} 17:00:00',
+                        'number_of_days': 1.0,
+                        'state': rnd.choice(['validate', 'validate', 'confirm']),
+                    })
+        leaves = env['hr.leave'].create(leave_vals)
+
+        # Tracker rows for every employee / leave type / year
+        tracker_vals = []
+        for employee_id in employee_ids:
+            for leave_type_id in leave_type_ids:
+                for year in year_list:
+                    total = rnd.choice([5.0, 10.0, 14.0, 20.0])
+                    taken = float(rnd.randint(0, int(total)))
+                    tracker_vals.append({
+                        'employee_id': employee_id,
+                        'leave_type_id': leave_type_id,
+                        'year': str(year),
+                        'total_allocation': total,
+                        'total_dynamic': total,
+                        'taken_leaves': taken,
+                        'system_taken': float(rnd.randint(0, int(taken))),
+                        'pending_requests': float(rnd.randint(0, 2)),
+                    })
+        trackers = env['hr.leave.tracker'].create(tracker_vals)
+
+        counts = {
+            'hr.department': len(department_ids),
+            'hr.employee': len(employee_ids),
+            'hr.leave.type': created_types,
+            'hr.leave.allocation': len(allocations),
+            'hr.leave': len(leaves),
+            'hr.leave.tracker': len(trackers),
+        }
+        _logger.info("Leave tracker benchmark data created: %s", counts)
+        return counts
+
+    # --- IMPORT FILE BUILDERS ---
+    def _benchmark_import_rows(self, size):
+        """Return `size` import rows built from existing tracker combinations."""
+        self.env.cr.execute("""
+            SELECT e.name, COALESCE(e.employee_number, CAST(e.id AS VARCHAR)),
+                   COALESCE(d.name, ''), t.leave_type_name, t.year
+            FROM hr_leave_tracker t
+            JOIN hr_employee e ON e.id = t.employee_id
+            LEFT JOIN hr_department d ON d.id = e.department_id
+            ORDER BY t.id
+            LIMIT %s
+        """, [size])
+        combos = self.env.cr.fetchall()
+        if not combos:
+            return []
+        rows = []
+        for i in range(size):
+            name, number, department, leave_type, year = combos[i % len(combos)]
+            total = float(10 + i % 11)
+            taken = float(i % 7)
+            rows.append([
+                name, number, department, leave_type, year,
+                total, taken, 1.0, total - taken, 2.0, 0.0, taken,
+            ])
+        return rows
+
+    def _benchmark_import_file(self, rows, file_type):
+        if file_type == 'xlsx':
+            wb = Workbook(write_only=True)
+            ws = wb.create_sheet()
+            ws.append(IMPORT_HEADERS)
+            for row in rows:
+                ws.append(row)
+            buf = io.BytesIO()
+            wb.save(buf)
+            return buf.getvalue()
+        buf = io.StringIO()
+        writer = csv.writer(buf)
+        writer.writerow(IMPORT_HEADERS)
+        writer.writerows(rows)
+        return buf.getvalue().encode('utf-8')
+
+    # --- MEASUREMENT ---
+    def _measure(self, name, func, rows=0):
+        """Run `func` inside a rolled-back savepoint and return its cost."""
+        cr = self.env.cr
+        self.env.flush_all()
+        self.env.invalidate_all()
+        cr.execute('SAVEPOINT hr_leave_benchmark')
+        queries_before = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            func()
+            self.env.flush_all()
+            elapsed = time.perf_counter() - start
+            queries = cr.sql_log_count - queries_before
+        finally:
+            cr.execute('ROLLBACK TO SAVEPOINT hr_leave_benchmark')
+            self.env.invalidate_all()
+        result = {
+            'name': name,
+            'rows': rows,
+            'wall_time': round(elapsed, 6),
+            'queries': queries,
+            'per_row_ms': round(elapsed * 1000.0 / rows, 4) if rows else None,
+        }
+        _logger.info("Leave tracker benchmark %s", json.dumps(result))
+        return result
+
+    # --- BENCHMARK CASES ---
+    def _bench_import(self, size, file_type):
+        rows = self._benchmark_import_rows(size)
+        content = self._benchmark_import_file(rows, file_type)
+
+        def run_import():
+            wizard = self.env['hr.leave.import'].with_context(hr_leave_import_skip_commit=True).create({
+                'import_file': base64.b64encode(content),
+                'import_filename': f'benchmark.{file_type}',
+                'update_existing': True,
+            })
+            wizard.action_import_data()
+
+        return self._measure(f'import_{file_type}_{size}', run_import, rows=len(rows))
+
+    def _bench_overview(self):
+        Overview = self.env['hr.employee.leave.overview']
+        tree_fields = [
+            'employee_number', 'employee_name', 'department_id',
+            'casual_balance', 'annual_balance', 'medical_balance', 'unpaid_balance',
+            'funeral_balance', 'marriage_balance', 'maternity_balance', 'paternity_balance',
+        ]
+        # The overview action opens on the current year
+        year = [('year', '=', str(date.today().year))]
+        count = Overview.search_count(year)
+        return [
+            self._measure('overview_list', lambda: Overview.search_read(year, tree_fields, limit=80), rows=min(count, 80)),
+            self._measure('overview_search', lambda: Overview.search_read(
+                year + [('employee_name', 'ilike', 'bench')], tree_fields, limit=80), rows=min(count, 80)),
+            self._measure('overview_filter_low_annual', lambda: Overview.search_read(
+                year + [('annual_balance', '<', 3)], tree_fields), rows=count),
+            self._measure('overview_group_department', lambda: Overview.read_group(
+                year, ['annual_balance:sum', 'casual_balance:sum'], ['department_id']), rows=count),
+            self._measure('department_rollup_list', lambda: self.env['hr.department.leave.rollup'].search_read(
+                [], ['department_id', 'leave_type_id', 'balance', 'low_count', 'critical_count']), rows=count),
+            self._measure('long_format_balances', lambda: self.env['hr.employee.leave.balance'].get_balances(), rows=count),
+        ]
+
+    def _bench_onchange(self, sample):
+        trackers = self.env['hr.leave.tracker'].search([], limit=sample)
+
+        def run_onchange():
+            for tracker in trackers:
+                record = self.env['hr.leave.tracker'].new({
+                    'employee_id': tracker.employee_id.id,
+                    'leave_type_id': tracker.leave_type_id.id,
+                    'year': tracker.year,
+                })
+                record._onchange_employee_leave_type()
+
+        return self._measure('onchange_employee_leave_type', run_onchange, rows=len(trackers))
+
+    def _bench_recompute(self, sample):
+        Tracker = self.env['hr.leave.tracker']
+        trackers = Tracker.search([], limit=sample)
+        field_names = [
+            'display_total', 'current_balance', 'name', 'employee_name',
+            'employee_number', 'department_id', 'leave_type_name',
+        ]
+
+        def run_recompute():
+            for fname in field_names:
+                self.env.add_to_compute(Tracker._fields[fname], trackers)
+            self.env.flush_all()
+
+        return self._measure('stored_compute_recompute', run_recompute, rows=len(trackers))
+
+    def _bench_overview_write(self, sample):
+        overviews = self.env['hr.employee.leave.overview'].search(
+            [('year', '=', str(date.today().year))], limit=sample)
+
+        def run_write():
+            for i, overview in enumerate(overviews):
+                overview.write({'casual_total': 10.0 + i % 5, 'annual_taken': float(i % 3)})
+
+        return self._measure('overview_write', run_write, rows=len(overviews))
+
+    @api.model
+    def _run(self, import_sizes=(1000, 10000, 100000), file_types=('csv', 'xlsx'), sample=200):
+        """Run every benchmark case and return the results as a JSON string.
+
+        :param import_sizes: number of rows for each import benchmark
+        :param file_types: import formats to measure ('csv', 'xlsx')
+        :param sample: number of records used by per-record benchmarks
+        """
+        self._check_superuser()
+        results = []
+        for file_type in file_types:
+            if file_type == 'xlsx' and not OPENPYXL_AVAILABLE:
+                _logger.warning("openpyxl not installed, skipping xlsx import benchmarks")
+                continue
+            for size in import_sizes:
+                results.append(self._bench_import(size, file_type))
+        results.extend(self._bench_overview())
+        results.append(self._bench_onchange(sample))
+        results.append(self._bench_recompute(sample))
+        results.append(self._bench_overview_write(sample))
+
+        return json.dumps({
+            'database': self.env.cr.dbname,
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'dataset': {
+                'employees': self.env['hr.employee'].search_count([]),
+                'trackers': self.env['hr.leave.tracker'].search_count([]),
+                'leaves': self.env['hr.leave'].search_count([]),
+                'allocations': self.env['hr.leave.allocation'].search_count([]),
+            },
+            'results': results,
+        }, indent=2)
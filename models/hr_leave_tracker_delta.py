@@ -0,0 +1,167 @@
+from odoo import models, fields, api
+from odoo.tools import sql
+from contextlib import contextmanager
+from datetime import date
+
+# Key of the buffer collecting delta rows inside a `_buffered` block
+DELTA_BUFFER_KEY = 'hr.leave.tracker.delta.buffer'
+
+# Tracker balance fields whose changes are logged
+TRACKED_FIELDS = [
+    'total_allocation', 'total_dynamic', 'taken_leaves', 'pending_requests',
+    'system_taken', 'annual_carry', 'expired_carry', 'imported_taken',
+]
+
+DELTA_SOURCES = [
+    ('form', 'Form / List Edit'),
+    ('import', 'Import'),
+    ('overview', 'Overview'),
+    ('system', 'System'),
+]
+
+
+class HrLeaveTrackerDelta(models.Model):
+    """Append-only log of tracker balance changes.
+
+    Rows are written by a single multi-row INSERT per tracker create or
+    write batch, or per `_buffered` block such as an import chunk, and
+    are never updated afterwards.
+    """
+    _name = 'hr.leave.tracker.delta'
+    _description = 'Leave Tracker Balance Change'
+    _order = 'changed_at desc, id desc'
+    _log_access = False
+
+    tracker_id = fields.Many2one('hr.leave.tracker', string='Tracker', readonly=True, ondelete='set null')
+    year = fields.Char(string='Year', readonly=True)
+    field_name = fields.Char(string='Field', readonly=True)
+    old_value = fields.Float(string='Old Value', readonly=True)
+    new_value = fields.Float(string='New Value', readonly=True)
+    source = fields.Selection(DELTA_SOURCES, string='Source', readonly=True)
+    user_id = fields.Many2one('res.users', string='User', readonly=True)
+    changed_at = fields.Datetime(string='Changed At', readonly=True)
+
+    def init(self):
+        """Index for whole-year and per-tracker reconstructions"""
+        if not sql.index_exists(self.env.cr, 'hr_leave_tracker_delta_year_tracker_index'):
+            sql.create_index(
+                self.env.cr, 'hr_leave_tracker_delta_year_tracker_index',
+                self._table, ['year', 'tracker_id', 'field_name', 'changed_at'],
+            )
+
+    # --- RECORDING ---
+    @api.model
+    def _record(self, rows):
+        """Insert (tracker_id, year, field_name, old_value, new_value) rows,
+        or add them to the buffer of the enclosing `_buffered` block."""
+        if not rows:
+            return
+        source = self.env.context.get('leave_delta_source', 'form')
+        rows = [row + (source,) for row in rows]
+        buffer = self.env.cr.precommit.data.get(DELTA_BUFFER_KEY)
+        if buffer is not None:
+            buffer.extend(rows)
+        else:
+            self._insert(rows)
+
+    @api.model
+    @contextmanager
+    def _buffered(self):
+        """Collect the rows recorded inside the block and insert them in one
+        statement when it exits normally.
+
+        Rows are dropped when the block raises, so it must enclose the
+        savepoint its changes belong to. A nested block hands its rows to
+        the enclosing one.
+        """
+        data = self.env.cr.precommit.data
+        outer = data.get(DELTA_BUFFER_KEY)
+        buffer = data[DELTA_BUFFER_KEY] = []
+        try:
+            yield
+        finally:
+            if outer is None:
+                data.pop(DELTA_BUFFER_KEY, None)
+            else:
+                data[DELTA_BUFFER_KEY] = outer
+        if outer is None:
+            self._insert(buffer)
+        else:
+            outer.extend(buffer)
+
+    @api.model
+    def _insert(self, rows):
+        if not rows:
+            return
+        tracker_ids, years, field_names, old_values, new_values, sources = zip(*rows)
+        self.env.cr.execute("""
+            INSERT INTO hr_leave_tracker_delta (
+                tracker_id, year, field_name, old_value, new_value, source, user_id, changed_at
+            )
+            SELECT tracker_id, year, field_name, old_value, new_value, source, %s, NOW() AT TIME ZONE 'UTC'
+            FROM unnest(%s::int[], %s::varchar[], %s::varchar[], %s::float8[], %s::float8[], %s::varchar[])
+                AS d(tracker_id, year, field_name, old_value, new_value, source)
+        """, [
+            self.env.uid, list(tracker_ids), list(years), list(field_names),
+            list(old_values), list(new_values), list(sources),
+        ])
+
+    # --- RECONSTRUCTION ---
+    @api.model
+    def balance_as_of(self, as_of, tracker_ids=None, year=None):
+        """Return {tracker_id: {field: value}} for the tracked fields as they
+        were at datetime `as_of`.
+
+        A value is the old value of the first change after `as_of`, or the
+        current value when it has not changed since, so only deltas newer
+        than `as_of` are read.
+
+        :param tracker_ids: restrict to these trackers
+        :param year: restrict to trackers of this year (uses the year index)
+        """
+        self.check_access_rights('read')
+        as_of = fields.Datetime.to_datetime(as_of)
+        Tracker = self.env['hr.leave.tracker']
+        domain = [('create_date', '<=', as_of)]
+        if tracker_ids is not None:
+            domain.append(('id', 'in', list(tracker_ids)))
+        if year:
+            domain.append(('year', '=', str(year)))
+        trackers = Tracker.search(domain)
+        result = {
+            values['id']: {fname: values[fname] for fname in TRACKED_FIELDS}
+            for values in trackers.read(TRACKED_FIELDS)
+        }
+        if not result:
+            return result
+
+        self.env.cr.execute("""
+            SELECT DISTINCT ON (tracker_id, field_name) tracker_id, field_name, old_value
+            FROM hr_leave_tracker_delta
+            WHERE changed_at > %s
+              AND tracker_id = ANY(%s)
+              AND (%s IS NULL OR year = %s)
+            ORDER BY tracker_id, field_name, changed_at, id
+        """, [as_of, list(result), year and str(year), year and str(year)])
+        for tracker_id, field_name, old_value in self.env.cr.fetchall():
+            if field_name in result[tracker_id]:
+                result[tracker_id][field_name] = old_value
+        return result
+
+    @api.model
+    def current_balance_as_of(self, as_of, tracker_ids=None, year=None):
+        """Return {tracker_id: balance} at `as_of`, with the same cutoff rule
+        as hr.leave.tracker.current_balance applied to that date."""
+        as_of = fields.Datetime.to_datetime(as_of)
+        values_by_tracker = self.balance_as_of(as_of, tracker_ids, year)
+        annual = set(self.env['hr.leave.tracker'].browse(list(values_by_tracker)).filtered(
+            lambda t: t.leave_type_name and t.leave_type_name.lower() == 'annual leave').ids)
+        after_cutoff = as_of.date() > date(as_of.year, 6, 30)
+        balances = {}
+        for tracker_id, values in values_by_tracker.items():
+            if tracker_id in annual:
+                taken = values['system_taken'] if after_cutoff else values['taken_leaves']
+                balances[tracker_id] = values['total_dynamic'] - taken
+            else:
+                balances[tracker_id] = values['total_allocation'] - values['taken_leaves']
+        return balances
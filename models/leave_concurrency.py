@@ -0,0 +1,41 @@
+import logging
+import random
+import time
+
+from psycopg2 import OperationalError
+
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
+
+_logger = logging.getLogger(__name__)
+
+MAX_RETRIES = 5
+RETRY_BASE_DELAY = 0.1
+
+
+def is_concurrency_error(error):
+    """Serialization failures, deadlocks and lock timeouts are worth a retry."""
+    return isinstance(error, OperationalError) and error.pgcode in PG_CONCURRENCY_ERRORS_TO_RETRY
+
+
+def run_with_retry(cr, func, savepoint=True, attempts=MAX_RETRIES, base_delay=RETRY_BASE_DELAY):
+    """Run `func` and retry it with exponential backoff on concurrency errors.
+
+    With `savepoint` the work is undone by rolling back to a savepoint, so
+    earlier work of the transaction is kept. Without it the whole
+    transaction is rolled back, which is required to get a fresh snapshot
+    after a serialization failure; callers then commit after each batch.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            if savepoint:
+                with cr.savepoint():
+                    return func()
+            return func()
+        except OperationalError as e:
+            if not is_concurrency_error(e) or attempt == attempts:
+                raise
+            if not savepoint:
+                cr.rollback()
+            delay = base_delay * 2 ** (attempt - 1) * (1 + random.random())
+            _logger.info("Concurrent update (%s), retry %d/%d in %.2fs", e.pgcode, attempt, attempts - 1, delay)
+            time.sleep(delay)
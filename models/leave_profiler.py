@@ -0,0 +1,108 @@
+import functools
+import json
+import logging
+import time
+from contextlib import contextmanager
+
+_logger = logging.getLogger(__name__)
+
+PROFILING_PARAM = 'hr_leave_tracker.profiling'
+
+
+def profiling_enabled(env):
+    """Profiling is on when the context has `leave_profiling` or the
+    `hr_leave_tracker.profiling` system parameter is set to a true value."""
+    if 'leave_profiling' in env.context:
+        return bool(env.context['leave_profiling'])
+    value = env['ir.config_parameter'].sudo().get_param(PROFILING_PARAM, '')
+    return value.strip().lower() in ('1', 'true', 'yes')
+
+
+class LeaveProfiler:
+    """Collect SQL query counts, elapsed time and row counts per phase.
+
+    Phases entered several times (e.g. once per imported row) are summed.
+    Row counts are only reported for phases that give one. When profiling
+    is disabled every call is a cheap no-op.
+    """
+
+    def __init__(self, env, name):
+        self.env = env
+        self.name = name
+        self.enabled = profiling_enabled(env)
+        self.phases = {}
+
+    @contextmanager
+    def phase(self, name, rows=None):
+        if not self.enabled:
+            yield
+            return
+        cr = self.env.cr
+        queries_before = cr.sql_log_count
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stats = self.phases.setdefault(name, {'queries': 0, 'elapsed': 0.0, 'calls': 0})
+            stats['queries'] += cr.sql_log_count - queries_before
+            stats['elapsed'] += time.perf_counter() - start
+            stats['calls'] += 1
+            if rows is not None:
+                stats['rows'] = stats.get('rows', 0) + rows
+
+    def add_rows(self, name, rows):
+        """Add to the row count of a phase after it has run."""
+        if self.enabled and name in self.phases:
+            stats = self.phases[name]
+            stats['rows'] = stats.get('rows', 0) + rows
+
+    def as_dict(self):
+        return {
+            'name': self.name,
+            'phases': {
+                name: dict(stats, elapsed=round(stats['elapsed'], 6))
+                for name, stats in self.phases.items()
+            },
+        }
+
+    def log(self):
+        if self.enabled and self.phases:
+            _logger.info("hr_leave_profile %s", json.dumps(self.as_dict()))
+
+    def summary(self):
+        """Human readable per-phase summary for wizard results."""
+        lines = []
+        for name, stats in self.phases.items():
+            line = "• %s: %.3fs, %d queries" % (name, stats['elapsed'], stats['queries'])
+            if 'rows' in stats:
+                line += ", %d rows" % stats['rows']
+            lines.append(line)
+        return '\n'.join(lines)
+
+
+def _record_count(records, result):
+    return len(records)
+
+
+def profiled(phase_name, rows=_record_count):
+    """Decorator profiling a model method as a single phase.
+
+    :param rows: callable ``(records, result)`` returning the row count of
+                 the call, by default the size of the recordset; ``None``
+                 for methods without a meaningful row count, such as
+                 ``@api.model`` methods that do not report one
+    """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = LeaveProfiler(self.env, f'{self._name}.{method.__name__}')
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            with profiler.phase(phase_name):
+                result = method(self, *args, **kwargs)
+            if rows is not None:
+                profiler.add_rows(phase_name, rows(self, result))
+            profiler.log()
+            return result
+        return wrapper
+    return decorator
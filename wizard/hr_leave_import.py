@@ -1,12 +1,18 @@
 import base64
 import csv
+import gzip
+import hashlib
 import io
+import json
 import logging
-from datetime import date
+from datetime import date, timedelta
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
 
+from ..models.leave_concurrency import is_concurrency_error, run_with_retry
+from ..models.leave_profiler import LeaveProfiler
+
 _logger = logging.getLogger(__name__)
 
 # Optional Excel libraries
@@ -22,6 +28,20 @@ try:
 except ImportError:
     OPENPYXL_AVAILABLE = False
 
+# Rows applied (and committed) per transaction
+IMPORT_CHUNK_SIZE = 500
+
+# Parsed files are cached as attachments keyed by content hash; bump the
+# version whenever parsing changes.
+IMPORT_CACHE_PREFIX = 'hr_leave_import_cache_'
+IMPORT_CACHE_VERSION = 2
+
+# Tracker fields compared to detect a file that was already fully applied
+APPLIED_CHECK_FIELDS = [
+    'total_allocation', 'taken_leaves', 'pending_requests',
+    'annual_carry', 'expired_carry', 'imported_taken',
+]
+
 
 class HrLeaveImport(models.TransientModel):
     _name = 'hr.leave.import'
@@ -49,6 +69,7 @@ class HrLeaveImport(models.TransientModel):
         required=True
     )
     import_results = fields.Text(string='Import Results', readonly=True)
+    file_hash = fields.Char(string='File Hash', readonly=True)
 
     @api.depends('import_filename')
     def _compute_file_type(self):
@@ -82,122 +103,72 @@ class HrLeaveImport(models.TransientModel):
         if not self.import_file:
             raise ValidationError(_('Please select a file to import.'))
 
+        profiler = LeaveProfiler(self.env, 'hr.leave.import.action_import_data')
         try:
-            # Parse file
-            if self.file_type in ['xlsx', 'xls']:
-                if self.file_type == 'xlsx' and not OPENPYXL_AVAILABLE:
-                    raise UserError(_('openpyxl is required to process .xlsx files.'))
-                if self.file_type == 'xls' and not XLRD_AVAILABLE:
-                    raise UserError(_('xlrd is required to process .xls files.'))
-                rows, headers = self._parse_excel_file()
-            else:
-                rows, headers = self._parse_csv_file()
-
-            if not rows:
-                raise ValidationError(_('No data found in the file.'))
+            with profiler.phase('decode'):
+                file_data = base64.b64decode(self.import_file)
+                self.file_hash = hashlib.sha256(file_data).hexdigest()
+
+            # Re-uploads of the same file reuse the parsed rows. Rows are
+            # resolved every time so fixed employees or leave types are picked up.
+            with profiler.phase('cache_lookup'):
+                rows = self._get_cached_rows(self.file_hash)
+
+            if rows is None:
+                # Parse file
+                with profiler.phase('parse'):
+                    if self.file_type in ['xlsx', 'xls']:
+                        if self.file_type == 'xlsx' and not OPENPYXL_AVAILABLE:
+                            raise UserError(_('openpyxl is required to process .xlsx files.'))
+                        if self.file_type == 'xls' and not XLRD_AVAILABLE:
+                            raise UserError(_('xlrd is required to process .xls files.'))
+                        rows, headers = self._parse_excel_file(file_data)
+                    else:
+                        rows, headers = self._parse_csv_file(file_data)
+                profiler.add_rows('parse', len(rows))
+
+                if not rows:
+                    raise ValidationError(_('No data found in the file.'))
+
+                self._store_cached_rows(self.file_hash, rows)
+
+            resolved = self._resolve_rows(rows, profiler)
+
+            # A file whose every row already matches the trackers is a no-op
+            with profiler.phase('applied_check'):
+                already_applied = self._is_already_applied(resolved)
+            if already_applied:
+                message = (
+                    f"Import skipped for year {self.year}.\n\n"
+                    f"✔ This file was already fully applied: all {len(resolved)} rows "
+                    f"match the current leave trackers."
+                )
+                if profiler.enabled:
+                    message += "\n\n⏱ Profile:\n" + profiler.summary()
+                    profiler.log()
+                self.import_results = message
+                return self._reopen_wizard()
 
             imported_count = 0
             updated_count = 0
-            errors = []
-
-            for row_num, row in enumerate(rows, start=2):
-                try:
-                    if not row or (isinstance(row, list) and not any(str(cell).strip() for cell in row)):
-                        continue
-
-                    # Map columns to expected order
-                    if isinstance(row, dict):        
-                        employee_name = str(row.get('Name', '')).strip()
-                        employee_id = str(row.get('Employee ID', '')).strip()
-                        department_name = str(row.get('Department', '')).strip()
-                        leave_type_name = str(row.get('Leave Type', '')).strip()
-                        year_val = int(row.get('Year', self.year))
-                        total_allocated = self.safe_float(row.get('Total Allocation', 0))
-                        days_taken = self.safe_float(row.get('Taken Leaves', 0))
-                        pending_requests = self.safe_float(row.get('Pending Requests', 0))
-                        current_balance = self.safe_float(row.get('Current Balance', 0))
-                        carry_forwarded = self.safe_float(row.get('Carry Forwarded', 0))
-                        expired_carry = self.safe_float(row.get('Expired Carry', 0))
-                        imported_taken = self.safe_float(row.get('Imported Taken', days_taken))
-                    else:
-                        if len(row) < 12:  # <--- change from 11 to 12
-                            errors.append(f"Row {row_num}: Insufficient columns (expected 12, got {len(row)})")
-                            continue
-
-                        employee_name = str(row[0] or '').strip()
-                        employee_id = str(row[1] or '').strip()
-                        department_name = str(row[2] or '').strip()
-                        leave_type_name = str(row[3] or '').strip()
-                        year_val = int(row[4] or self.year)
-                        total_allocated = self.safe_float(row[5])
-                        days_taken = self.safe_float(row[6])
-                        pending_requests = self.safe_float(row[7])
-                        current_balance = self.safe_float(row[8])
-                        carry_forwarded = self.safe_float(row[9])  
-                        expired_carry = self.safe_float(row[10])
-                        imported_taken = self.safe_float(row[11])  # <--- add this line instead of imported_taken = days_taken
-
-                    _logger.info("Processing Row %d: Employee ID='%s', Employee Name='%s'", row_num, employee_id, employee_name)
-
-                    if not employee_id or not leave_type_name:
-                        errors.append(f"Row {row_num}: Missing Employee ID or Leave Type")
-                        continue
-
-                    employee = self.env['hr.employee'].search([
-                        '|',
-                        ('employee_number', '=', employee_id),
-                        ('name', 'ilike', employee_name)
-                    ], limit=1)
-                    if not employee:
-                        errors.append(f"Row {row_num}: Could not find employee {employee_id} ({employee_name})")
-                        continue
-
-                    leave_type = self.env['hr.leave.type'].search([('name', '=', leave_type_name)], limit=1)
-                    if not leave_type:
-                        errors.append(f"Row {row_num}: Leave type '{leave_type_name}' not found")
-                        continue
-
-                    department = self.env['hr.department'].search([('name','=',department_name)], limit=1)
-                    department_id = department.id if department else False
-
-                    tracker_data = {
-                        'employee_id': employee.id,
-                        'leave_type_id': leave_type.id,
-                        'leave_type_name': leave_type_name,
-                        'year': year_val,
-                        'total_allocation': total_allocated,
-                        'taken_leaves': days_taken,
-                        'imported_taken': imported_taken, 
-                        'pending_requests': pending_requests,
-                        'current_balance': current_balance,
-                        'annual_carry': carry_forwarded,
-                        'expired_carry': expired_carry,
-                        'employee_name': employee.name,
-                        'employee_number': employee.employee_number or '',
-                        'department_id': department_id,
-                        'name': f"{leave_type_name} {year_val}",
-                    }
-
-                    existing_tracker = self.env['hr.leave.tracker'].search([
-                        ('employee_id', '=', employee.id),
-                        ('leave_type_id', '=', leave_type.id),
-                        ('year', '=', year_val)
-                    ], limit=1)
-
-                    if existing_tracker:
-                        if self.update_existing:
-                            existing_tracker.write(tracker_data)
-                            updated_count += 1
-                        else:
-                            errors.append(f"Row {row_num}: Record exists, skipped")
-                    else:
-                        self.env['hr.leave.tracker'].create(tracker_data)
-                        imported_count += 1
-
-                except Exception as e:
-                    errors.append(f"Row {row_num}: {str(e)}")
-
-            self.env.cr.commit()
+            errors = [f"Row {row_num}: {error}" for row_num, tracker_data, error in resolved if error]
+            to_apply = [(row_num, tracker_data) for row_num, tracker_data, error in resolved if not error]
+
+            # Rows are applied and committed in chunks so a large import does
+            # not hold row locks in one long transaction. A chunk hitting a
+            # concurrent update, including in the commit-time rollup and
+            # delta hooks, is retried with backoff.
+            skip_commit = self.env.context.get('hr_leave_import_skip_commit')
+            for offset in range(0, len(to_apply), IMPORT_CHUNK_SIZE):
+                chunk = to_apply[offset:offset + IMPORT_CHUNK_SIZE]
+                chunk_imported, chunk_updated, chunk_errors = run_with_retry(
+                    self.env.cr,
+                    lambda: self._apply_chunk(chunk, profiler, commit=not skip_commit),
+                    savepoint=bool(skip_commit),
+                )
+                imported_count += chunk_imported
+                updated_count += chunk_updated
+                errors.extend(chunk_errors)
 
             message = f"Import completed for year {self.year}!\n\n"
             message += f"✅ Imported: {imported_count} new records\n"
@@ -210,22 +181,301 @@ class HrLeaveImport(models.TransientModel):
                     message += f"... and {len(errors) - 10} more errors"
             else:
                 message += "\n🎉 All records processed successfully!"
+            if profiler.enabled:
+                message += "\n\n⏱ Profile:\n" + profiler.summary()
+                profiler.log()
 
             self.import_results = message
-            return {
-                'type': 'ir.actions.act_window',
-                'res_model': 'hr.leave.import',
-                'res_id': self.id,
-                'view_mode': 'form',
-                'target': 'new',
-            }
+            return self._reopen_wizard()
 
         except Exception as e:
             raise UserError(_('Error processing file: %s') % str(e))
 
-    def _parse_csv_file(self):
+    def _reopen_wizard(self):
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': 'hr.leave.import',
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _resolve_rows(self, rows, profiler):
+        """Map parsed rows to tracker values.
+
+        Returns a list of (row number, tracker values, error) triples where
+        exactly one of tracker values and error is set. Rows that are empty
+        are dropped. Employees, leave types and departments are looked up
+        once for all rows.
+        """
+        resolved = []
+        entries = []
+
+        for row_num, row in enumerate(rows, start=2):
+            try:
+                if not row or (isinstance(row, list) and not any(str(cell).strip() for cell in row)):
+                    continue
+
+                # Map columns to expected order
+                if isinstance(row, dict):        
+                    employee_name = str(row.get('Name', '')).strip()
+                    employee_id = str(row.get('Employee ID', '')).strip()
+                    department_name = str(row.get('Department', '')).strip()
+                    leave_type_name = str(row.get('Leave Type', '')).strip()
+                    year_val = int(row.get('Year', self.year))
+                    total_allocated = self.safe_float(row.get('Total Allocation', 0))
+                    days_taken = self.safe_float(row.get('Taken Leaves', 0))
+                    pending_requests = self.safe_float(row.get('Pending Requests', 0))
+                    current_balance = self.safe_float(row.get('Current Balance', 0))
+                    carry_forwarded = self.safe_float(row.get('Carry Forwarded', 0))
+                    expired_carry = self.safe_float(row.get('Expired Carry', 0))
+                    imported_taken = self.safe_float(row.get('Imported Taken', days_taken))
+                else:
+                    if len(row) < 12:  # <--- change from 11 to 12
+                        resolved.append((row_num, None, f"Insufficient columns (expected 12, got {len(row)})"))
+                        continue
+
+                    employee_name = str(row[0] or '').strip()
+                    employee_id = str(row[1] or '').strip()
+                    department_name = str(row[2] or '').strip()
+                    leave_type_name = str(row[3] or '').strip()
+                    year_val = int(row[4] or self.year)
+                    total_allocated = self.safe_float(row[5])
+                    days_taken = self.safe_float(row[6])
+                    pending_requests = self.safe_float(row[7])
+                    current_balance = self.safe_float(row[8])
+                    carry_forwarded = self.safe_float(row[9])  
+                    expired_carry = self.safe_float(row[10])
+                    imported_taken = self.safe_float(row[11])  # <--- add this line instead of imported_taken = days_taken
+
+                _logger.info("Processing Row %d: Employee ID='%s', Employee Name='%s'", row_num, employee_id, employee_name)
+
+                if not employee_id or not leave_type_name:
+                    resolved.append((row_num, None, "Missing Employee ID or Leave Type"))
+                    continue
+
+                entries.append((row_num, employee_id, employee_name, department_name, leave_type_name, {
+                    'leave_type_name': leave_type_name,
+                    'year': year_val,
+                    'total_allocation': total_allocated,
+                    'taken_leaves': days_taken,
+                    'imported_taken': imported_taken, 
+                    'pending_requests': pending_requests,
+                    'current_balance': current_balance,
+                    'annual_carry': carry_forwarded,
+                    'expired_carry': expired_carry,
+                    'name': f"{leave_type_name} {year_val}",
+                }))
+
+            except Exception as e:
+                resolved.append((row_num, None, str(e)))
+
+        with profiler.phase('resolve', rows=len(entries)):
+            find_employee, leave_types, departments = self._lookup_records(entries)
+
+        for row_num, employee_id, employee_name, department_name, leave_type_name, tracker_data in entries:
+            try:
+                employee = find_employee(employee_id, employee_name)
+                leave_type = leave_types.get(leave_type_name)
+                department = departments.get(department_name)
+                if not employee:
+                    resolved.append((row_num, None, f"Could not find employee {employee_id} ({employee_name})"))
+                    continue
+                if not leave_type:
+                    resolved.append((row_num, None, f"Leave type '{leave_type_name}' not found"))
+                    continue
+
+                tracker_data.update({
+                    'employee_id': employee.id,
+                    'leave_type_id': leave_type.id,
+                    'employee_name': employee.name,
+                    'employee_number': employee.employee_number or '',
+                    'department_id': department.id if department else False,
+                })
+                resolved.append((row_num, tracker_data, None))
+
+            except Exception as e:
+                resolved.append((row_num, None, str(e)))
+
+        resolved.sort(key=lambda item: item[0])
+        return resolved
+
+    def _lookup_records(self, entries):
+        """Look up the employees, leave types and departments of `entries`
+        with one search per model.
+
+        Returns a ``find_employee(employee_id, employee_name)`` function and
+        dicts of leave types and departments by name. Employees are matched
+        on their number; the name search is only run, once per name, for
+        numbers that match no employee.
+        """
+        Employee = self.env['hr.employee']
+        employees_by_number = {}
+        numbers = list({entry[1] for entry in entries})
+        for employee in Employee.search([('employee_number', 'in', numbers)]):
+            employees_by_number.setdefault(employee.employee_number, employee)
+        employees_by_name = {}
+
+        def find_employee(employee_id, employee_name):
+            employee = employees_by_number.get(employee_id)
+            if not employee:
+                if employee_name not in employees_by_name:
+                    employees_by_name[employee_name] = Employee.search([('name', 'ilike', employee_name)], limit=1)
+                employee = employees_by_name[employee_name]
+            return employee
+
+        leave_types = {}
+        for leave_type in self.env['hr.leave.type'].search([('name', 'in', list({entry[4] for entry in entries}))]):
+            leave_types.setdefault(leave_type.name, leave_type)
+        departments = {}
+        for department in self.env['hr.department'].search([('name', 'in', list({entry[3] for entry in entries}))]):
+            departments.setdefault(department.name, department)
+        return find_employee, leave_types, departments
+
+    def _apply_chunk(self, numbered_rows, profiler, commit=True):
+        """Apply rows with `_apply_rows`, then flush and commit them. The
+        balance deltas of the chunk are inserted in one statement."""
+        with self.env['hr.leave.tracker.delta']._buffered():
+            result = self._apply_rows(numbered_rows, profiler)
+        with profiler.phase('commit'):
+            self.env.flush_all()
+            # Benchmarks run the import inside a savepoint they roll back
+            if commit:
+                self.env.cr.commit()
+        return result
+
+    def _apply_rows(self, numbered_rows, profiler):
+        """Write (row number, tracker values) pairs to the trackers.
+
+        Returns (imported count, updated count, error messages).
+        """
+        imported_count = 0
+        updated_count = 0
+        errors = []
+        Tracker = self.env['hr.leave.tracker'].with_context(leave_delta_source='import')
+        Delta = self.env['hr.leave.tracker.delta']
+
+        for row_num, tracker_data in numbered_rows:
+            try:
+                # a failing row must not abort the rest of the chunk, and
+                # its deltas are dropped with its savepoint
+                with profiler.phase('write', rows=1), Delta._buffered(), self.env.cr.savepoint():
+                    # locked so parallel imports and edits cannot create duplicates
+                    existing_tracker = Tracker._find_tracker_locked(
+                        tracker_data['employee_id'], tracker_data['leave_type_id'], tracker_data['year'])
+
+                    if existing_tracker:
+                        if self.update_existing:
+                            existing_tracker.write(tracker_data)
+                            outcome = 'updated'
+                        else:
+                            outcome = 'skipped'
+                    else:
+                        Tracker.create(tracker_data)
+                        outcome = 'imported'
+
+            except Exception as e:
+                if is_concurrency_error(e):
+                    raise
+                errors.append(f"Row {row_num}: {str(e)}")
+                continue
+
+            # counted once the savepoint has been released
+            if outcome == 'updated':
+                updated_count += 1
+            elif outcome == 'imported':
+                imported_count += 1
+            else:
+                errors.append(f"Row {row_num}: Record exists, skipped")
+
+        return imported_count, updated_count, errors
+
+    def _is_already_applied(self, resolved):
+        """True when the file has no error rows and every row matches the
+        values of an existing tracker, checked in one query."""
+        if not resolved or any(error for row_num, tracker_data, error in resolved):
+            return False
+        values = [tracker_data for row_num, tracker_data, error in resolved]
+        if any(vals[fname] is None for vals in values for fname in APPLIED_CHECK_FIELDS):
+            return False
+        self.env['hr.leave.tracker'].flush_model()
+        columns = ['employee_id', 'leave_type_id', 'year'] + APPLIED_CHECK_FIELDS
+        self.env.cr.execute(f"""
+            SELECT COUNT(*)
+            FROM unnest(%s::int[], %s::int[], %s::varchar[], {', '.join(['%s::float8[]'] * len(APPLIED_CHECK_FIELDS))})
+                AS f({', '.join(columns)})
+            JOIN hr_leave_tracker t
+              ON t.employee_id = f.employee_id
+             AND t.leave_type_id = f.leave_type_id
+             AND t.year = f.year
+            WHERE {' AND '.join(f'ABS(COALESCE(t.{fname}, 0) - f.{fname}) < 0.005' for fname in APPLIED_CHECK_FIELDS)}
+        """, [
+            [vals['employee_id'] for vals in values],
+            [vals['leave_type_id'] for vals in values],
+            [str(vals['year']) for vals in values],
+        ] + [[vals[fname] for vals in values] for fname in APPLIED_CHECK_FIELDS])
+        return self.env.cr.fetchone()[0] == len(values)
+
+    # --- PARSED FILE CACHE ---
+    def _cache_name(self, file_hash):
+        return f'{IMPORT_CACHE_PREFIX}{file_hash}_v{IMPORT_CACHE_VERSION}.json.gz'
+
+    def _get_cached_rows(self, file_hash):
+        """Return the parsed rows cached for this file, or None."""
+        attachment = self.env['ir.attachment'].sudo().search([
+            ('name', '=', self._cache_name(file_hash)),
+            ('res_model', '=', self._name),
+        ], limit=1)
+        if not attachment:
+            return None
         try:
-            file_data = base64.b64decode(self.import_file)
+            payload = json.loads(gzip.decompress(attachment.raw))
+        except (OSError, ValueError):
+            _logger.warning("Discarding unreadable leave import cache %s", attachment.name)
+            attachment.unlink()
+            return None
+        _logger.info("Leave import cache hit for %s (%d rows)", file_hash, len(payload))
+        return payload
+
+    def _store_cached_rows(self, file_hash, rows):
+        """Store parsed rows as a gzipped JSON attachment in the filestore.
+        Excel dates are stored as their string form, which is how
+        `_resolve_rows` reads them anyway."""
+        self.env['ir.attachment'].sudo().create({
+            'name': self._cache_name(file_hash),
+            'raw': gzip.compress(json.dumps(rows, separators=(',', ':'), default=str).encode('utf-8')),
+            'res_model': self._name,
+            'mimetype': 'application/gzip',
+        })
+
+    @api.model
+    def _cron_evict_import_cache(self):
+        """Delete cached import files older than the configured age, then
+        the oldest ones until the cache fits the configured size."""
+        params = self.env['ir.config_parameter'].sudo()
+        max_age_days = int(params.get_param('hr_leave_tracker.import_cache_days', 7))
+        max_size = int(params.get_param('hr_leave_tracker.import_cache_max_mb', 200)) * 1024 * 1024
+        Attachment = self.env['ir.attachment'].sudo()
+        domain = [('res_model', '=', self._name), ('name', '=like', f'{IMPORT_CACHE_PREFIX}%')]
+
+        expired = Attachment.search(domain + [
+            ('create_date', '<', fields.Datetime.now() - timedelta(days=max_age_days)),
+        ])
+        expired.unlink()
+
+        evicted = Attachment.browse()
+        total_size = 0
+        for attachment in Attachment.search(domain, order='create_date desc, id desc'):
+            total_size += attachment.file_size
+            if total_size > max_size:
+                evicted |= attachment
+        evicted.unlink()
+        _logger.info("Leave import cache evicted %d expired and %d oversize files", len(expired), len(evicted))
+
+    def _parse_csv_file(self, file_data=None):
+        try:
+            if file_data is None:
+                file_data = base64.b64decode(self.import_file)
             for enc in ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']:
                 try:
                     csv_data = file_data.decode(enc)
@@ -242,8 +492,9 @@ class HrLeaveImport(models.TransientModel):
         except Exception as e:
             raise UserError(_('CSV parsing error: %s') % str(e))
 
-    def _parse_excel_file(self):
-        file_data = base64.b64decode(self.import_file)
+    def _parse_excel_file(self, file_data=None):
+        if file_data is None:
+            file_data = base64.b64decode(self.import_file)
         try:
             if self.file_type == 'xlsx':
                 wb = load_workbook(io.BytesIO(file_data), read_only=True)